@@ -0,0 +1,111 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Optional
+
+from SParLex.Ast import Ast, TokAst
+
+
+# The ASTs of the benchmarks' sample language. They only use the Ast and TokAst base classes, so the benchmarks run
+# against older versions of SParLex too.
+
+@dataclass(slots=True)
+class ProgramAst(Ast):
+    items: List[Ast]
+
+
+@dataclass(slots=True)
+class TypeAst(Ast):
+    name: TokAst
+    element: Optional[TypeAst]
+
+
+@dataclass(slots=True)
+class FieldAst(Ast):
+    name: TokAst
+    type: TypeAst
+
+
+@dataclass(slots=True)
+class StructAst(Ast):
+    name: TokAst
+    fields: List[FieldAst]
+
+
+@dataclass(slots=True)
+class FunctionAst(Ast):
+    name: TokAst
+    params: List[FieldAst]
+    return_type: Optional[TypeAst]
+    body: List[Ast]
+
+
+@dataclass(slots=True)
+class LetAst(Ast):
+    name: TokAst
+    type: Optional[TypeAst]
+    value: Ast
+
+
+@dataclass(slots=True)
+class IfAst(Ast):
+    condition: Ast
+    then: List[Ast]
+    otherwise: Optional[Ast | List[Ast]]
+
+
+@dataclass(slots=True)
+class WhileAst(Ast):
+    condition: Ast
+    body: List[Ast]
+
+
+@dataclass(slots=True)
+class ReturnAst(Ast):
+    value: Optional[Ast]
+
+
+@dataclass(slots=True)
+class ExprStmtAst(Ast):
+    target: Ast
+    value: Optional[Ast]
+
+
+@dataclass(slots=True)
+class BinaryExprAst(Ast):
+    lhs: Ast
+    op: TokAst
+    rhs: Ast
+
+
+@dataclass(slots=True)
+class UnaryExprAst(Ast):
+    op: TokAst
+    operand: Ast
+
+
+@dataclass(slots=True)
+class CallAst(Ast):
+    callee: Ast
+    args: List[Ast]
+
+
+@dataclass(slots=True)
+class MemberAst(Ast):
+    target: Ast
+    name: TokAst
+
+
+@dataclass(slots=True)
+class IndexAst(Ast):
+    target: Ast
+    index: Ast
+
+
+@dataclass(slots=True)
+class ArrayAst(Ast):
+    items: List[Ast]
+
+
+__all__ = [
+    "ProgramAst", "TypeAst", "FieldAst", "StructAst", "FunctionAst", "LetAst", "IfAst", "WhileAst", "ReturnAst",
+    "ExprStmtAst", "BinaryExprAst", "UnaryExprAst", "CallAst", "MemberAst", "IndexAst", "ArrayAst"]
@@ -0,0 +1,302 @@
+from __future__ import annotations
+from typing import List, Tuple
+
+from SParLex.Ast import Ast, TokAst
+from SParLex.Lexer.Tokens import SpecialToken
+from SParLex.Parser.Parser import Parser, parser_rule
+
+from SampleAsts import *
+from SampleTokenType import SampleTokenType as T
+
+
+class SampleParser(Parser):
+    """
+    SampleParser parses the benchmarks' sample language (see SampleSource), with the constructs a real grammar leans on:
+    alternations of rules and of tokens, optional parts, separated and unseparated lists, and a rule per level of
+    expression precedence, so the benchmarks exercise the same paths as a real parser does. It only uses the parts of
+    the Parser API that every version of SParLex has.
+    """
+
+    # ===== ITEMS =====
+
+    @parser_rule
+    def parse_root(self) -> ProgramAst:
+        c1 = self.current_pos()
+        p1 = self.parse_item().parse_zero_or_more(SpecialToken.NO_TOK)
+        return ProgramAst(c1, p1)
+
+    @parser_rule
+    def parse_item(self) -> Ast:
+        p1 = self.parse_function() | self.parse_struct() | self.parse_let()
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_struct(self) -> StructAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwStruct).parse_once()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        self.parse_token(T.TkLBrace).parse_once()
+        p2 = self.parse_field().parse_zero_or_more(T.TkComma)
+        self.parse_token(T.TkRBrace).parse_once()
+        return StructAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_field(self) -> FieldAst:
+        c1 = self.current_pos()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        self.parse_token(T.TkColon).parse_once()
+        p2 = self.parse_type().parse_once()
+        return FieldAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_type(self) -> TypeAst:
+        c1 = self.current_pos()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        p2 = self.parse_type_element().parse_optional()
+        return TypeAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_type_element(self) -> TypeAst:
+        self.parse_token(T.TkLBrack).parse_once()
+        p1 = self.parse_type().parse_once()
+        self.parse_token(T.TkRBrack).parse_once()
+        return p1
+
+    @parser_rule
+    def parse_function(self) -> FunctionAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwFn).parse_once()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        self.parse_token(T.TkLParen).parse_once()
+        p2 = self.parse_field().parse_zero_or_more(T.TkComma)
+        self.parse_token(T.TkRParen).parse_once()
+        p3 = self.parse_return_type().parse_optional()
+        p4 = self.parse_block().parse_once()
+        return FunctionAst(c1, p1, p2, p3, p4)
+
+    @parser_rule
+    def parse_return_type(self) -> TypeAst:
+        self.parse_token(T.TkArrow).parse_once()
+        p1 = self.parse_type().parse_once()
+        return p1
+
+    # ===== STATEMENTS =====
+
+    @parser_rule
+    def parse_block(self) -> List[Ast]:
+        self.parse_token(T.TkLBrace).parse_once()
+        p1 = self.parse_statement().parse_zero_or_more(SpecialToken.NO_TOK)
+        self.parse_token(T.TkRBrace).parse_once()
+        return p1
+
+    @parser_rule
+    def parse_statement(self) -> Ast:
+        p1 = self.parse_let() | self.parse_if() | self.parse_while() | self.parse_return() | self.parse_expression_statement()
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_let(self) -> LetAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwLet).parse_once()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        p2 = self.parse_let_type().parse_optional()
+        self.parse_token(T.TkEq).parse_once()
+        p3 = self.parse_expression().parse_once()
+        self.parse_token(T.TkSemicolon).parse_once()
+        return LetAst(c1, p1, p2, p3)
+
+    @parser_rule
+    def parse_let_type(self) -> TypeAst:
+        self.parse_token(T.TkColon).parse_once()
+        p1 = self.parse_type().parse_once()
+        return p1
+
+    @parser_rule
+    def parse_if(self) -> IfAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwIf).parse_once()
+        p1 = self.parse_expression().parse_once()
+        p2 = self.parse_block().parse_once()
+        p3 = self.parse_else().parse_optional()
+        return IfAst(c1, p1, p2, p3)
+
+    @parser_rule
+    def parse_else(self) -> Ast | List[Ast]:
+        self.parse_token(T.KwElse).parse_once()
+        p1 = self.parse_if() | self.parse_block()
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_while(self) -> WhileAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwWhile).parse_once()
+        p1 = self.parse_expression().parse_once()
+        p2 = self.parse_block().parse_once()
+        return WhileAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_return(self) -> ReturnAst:
+        c1 = self.current_pos()
+        self.parse_token(T.KwReturn).parse_once()
+        p1 = self.parse_expression().parse_optional()
+        self.parse_token(T.TkSemicolon).parse_once()
+        return ReturnAst(c1, p1)
+
+    @parser_rule
+    def parse_expression_statement(self) -> ExprStmtAst:
+        c1 = self.current_pos()
+        p1 = self.parse_expression().parse_once()
+        p2 = self.parse_assigned_value().parse_optional()
+        self.parse_token(T.TkSemicolon).parse_once()
+        return ExprStmtAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_assigned_value(self) -> Ast:
+        self.parse_token(T.TkEq).parse_once()
+        p1 = self.parse_expression().parse_once()
+        return p1
+
+    # ===== EXPRESSIONS =====
+
+    @parser_rule
+    def parse_expression(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_and().parse_once()
+        p2 = self.parse_or_tail().parse_zero_or_more(SpecialToken.NO_TOK)
+        return _fold(c1, p1, p2)
+
+    @parser_rule
+    def parse_or_tail(self) -> Tuple[TokAst, Ast]:
+        p1 = self.parse_token(T.TkOrOr).parse_once()
+        p2 = self.parse_and().parse_once()
+        return p1, p2
+
+    @parser_rule
+    def parse_and(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_comparison().parse_once()
+        p2 = self.parse_and_tail().parse_zero_or_more(SpecialToken.NO_TOK)
+        return _fold(c1, p1, p2)
+
+    @parser_rule
+    def parse_and_tail(self) -> Tuple[TokAst, Ast]:
+        p1 = self.parse_token(T.TkAndAnd).parse_once()
+        p2 = self.parse_comparison().parse_once()
+        return p1, p2
+
+    @parser_rule
+    def parse_comparison(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_additive().parse_once()
+        p2 = self.parse_comparison_tail().parse_zero_or_more(SpecialToken.NO_TOK)
+        return _fold(c1, p1, p2)
+
+    @parser_rule
+    def parse_comparison_tail(self) -> Tuple[TokAst, Ast]:
+        p1 = self.parse_token(T.TkEqEq) | self.parse_token(T.TkNotEq) | self.parse_token(T.TkLtEq) | self.parse_token(T.TkGtEq) | self.parse_token(T.TkLt) | self.parse_token(T.TkGt)
+        p2 = p1.parse_once()
+        p3 = self.parse_additive().parse_once()
+        return p2, p3
+
+    @parser_rule
+    def parse_additive(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_multiplicative().parse_once()
+        p2 = self.parse_additive_tail().parse_zero_or_more(SpecialToken.NO_TOK)
+        return _fold(c1, p1, p2)
+
+    @parser_rule
+    def parse_additive_tail(self) -> Tuple[TokAst, Ast]:
+        p1 = (self.parse_token(T.TkPlus) | self.parse_token(T.TkMinus)).parse_once()
+        p2 = self.parse_multiplicative().parse_once()
+        return p1, p2
+
+    @parser_rule
+    def parse_multiplicative(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_unary().parse_once()
+        p2 = self.parse_multiplicative_tail().parse_zero_or_more(SpecialToken.NO_TOK)
+        return _fold(c1, p1, p2)
+
+    @parser_rule
+    def parse_multiplicative_tail(self) -> Tuple[TokAst, Ast]:
+        p1 = (self.parse_token(T.TkStar) | self.parse_token(T.TkSlash)).parse_once()
+        p2 = self.parse_unary().parse_once()
+        return p1, p2
+
+    @parser_rule
+    def parse_unary(self) -> Ast:
+        p1 = self.parse_prefixed() | self.parse_postfix()
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_prefixed(self) -> UnaryExprAst:
+        c1 = self.current_pos()
+        p1 = (self.parse_token(T.TkMinus) | self.parse_token(T.TkBang)).parse_once()
+        p2 = self.parse_unary().parse_once()
+        return UnaryExprAst(c1, p1, p2)
+
+    @parser_rule
+    def parse_postfix(self) -> Ast:
+        c1 = self.current_pos()
+        p1 = self.parse_primary().parse_once()
+        for kind, value in self.parse_postfix_operation().parse_zero_or_more(SpecialToken.NO_TOK):
+            p1 = CallAst(c1, p1, value) if kind == "call" else MemberAst(c1, p1, value) if kind == "member" else IndexAst(c1, p1, value)
+        return p1
+
+    @parser_rule
+    def parse_postfix_operation(self) -> Tuple[str, Ast | List[Ast]]:
+        p1 = self.parse_call_arguments() | self.parse_member_access() | self.parse_index()
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_call_arguments(self) -> Tuple[str, List[Ast]]:
+        self.parse_token(T.TkLParen).parse_once()
+        p1 = self.parse_expression().parse_zero_or_more(T.TkComma)
+        self.parse_token(T.TkRParen).parse_once()
+        return "call", p1
+
+    @parser_rule
+    def parse_member_access(self) -> Tuple[str, TokAst]:
+        self.parse_token(T.TkDot).parse_once()
+        p1 = self.parse_token(T.LxIdentifier).parse_once()
+        return "member", p1
+
+    @parser_rule
+    def parse_index(self) -> Tuple[str, Ast]:
+        self.parse_token(T.TkLBrack).parse_once()
+        p1 = self.parse_expression().parse_once()
+        self.parse_token(T.TkRBrack).parse_once()
+        return "index", p1
+
+    @parser_rule
+    def parse_primary(self) -> Ast:
+        p1 = (
+            self.parse_token(T.LxIdentifier) | self.parse_token(T.LxNumber) | self.parse_token(T.LxString) |
+            self.parse_token(T.KwTrue) | self.parse_token(T.KwFalse) | self.parse_parenthesised() | self.parse_array())
+        return p1.parse_once()
+
+    @parser_rule
+    def parse_parenthesised(self) -> Ast:
+        self.parse_token(T.TkLParen).parse_once()
+        p1 = self.parse_expression().parse_once()
+        self.parse_token(T.TkRParen).parse_once()
+        return p1
+
+    @parser_rule
+    def parse_array(self) -> ArrayAst:
+        c1 = self.current_pos()
+        self.parse_token(T.TkLBrack).parse_once()
+        p1 = self.parse_expression().parse_zero_or_more(T.TkComma)
+        self.parse_token(T.TkRBrack).parse_once()
+        return ArrayAst(c1, p1)
+
+
+def _fold(pos: int, lhs: Ast, tails: List[Tuple[TokAst, Ast]]) -> Ast:
+    # Apply a level's operators left-associatively.
+    for op, rhs in tails:
+        lhs = BinaryExprAst(pos, lhs, op, rhs)
+    return lhs
+
+
+__all__ = ["SampleParser"]
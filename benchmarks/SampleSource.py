@@ -0,0 +1,136 @@
+from __future__ import annotations
+from random import Random
+from typing import List
+
+
+class SampleSource:
+    """
+    SampleSource generates source code in the benchmarks' sample language (see SampleParser), deterministically from a
+    seed, so a benchmark run on one machine can be repeated exactly on another. The code is a sequence of structs,
+    functions and globals, with statements and expressions nested a few levels deep, and comments and strings mixed in.
+    The "failing" variant has one unlexable character about nine-tenths of the way through the code, for timing how
+    long a parse takes to fail and how long its error takes to format.
+
+    Example:
+        - code = SampleSource(seed=0).generate(1 << 20)
+        - code, error_offset = SampleSource(seed=0).generate_failing(1 << 20)
+    """
+
+    _random: Random
+    _depth: int
+
+    def __init__(self, seed: int = 0) -> None:
+        self._random = Random(seed)
+        self._depth = 0
+
+    def generate(self, size: int) -> str:
+        # Generate items until the code is at least "size" characters long.
+        parts, length = ["\n"], 1
+        while length < size:
+            item = self._item()
+            parts.append(item)
+            length += len(item)
+        return "".join(parts)
+
+    def generate_failing(self, size: int) -> tuple[str, int]:
+        # Put an "@" at the start of a line (between items or statements) near the end of the code.
+        code = self.generate(size)
+        offset = code.find("\n", size * 9 // 10) + 1 or len(code)
+        return code[:offset] + "@" + code[offset:], offset
+
+    # ===== ITEMS =====
+
+    def _item(self) -> str:
+        kind = self._random.random()
+        if kind < 0.15:
+            return self._struct()
+        if kind < 0.25:
+            return f"let {self._name('g')}: {self._type()} = {self._expression()};\n"
+        return self._function()
+
+    def _struct(self) -> str:
+        fields = ", ".join(f"{self._name('f')}: {self._type()}" for _ in range(self._random.randint(1, 5)))
+        return f"/* A struct with some fields. */\nstruct {self._name('S')} {{{fields}}}\n\n"
+
+    def _function(self) -> str:
+        params = ", ".join(f"{self._name('p')}: {self._type()}" for _ in range(self._random.randint(0, 4)))
+        returns = f" -> {self._type()}" if self._random.random() < 0.7 else ""
+        return f"// A function.\nfn {self._name('func')}({params}){returns} {self._block(1)}\n\n"
+
+    def _type(self) -> str:
+        return self._random.choice(["Int", "Float", "Str", "Bool"]) if self._random.random() < 0.8 else f"Array[{self._type()}]"
+
+    def _name(self, prefix: str) -> str:
+        return f"{prefix}{self._random.randint(0, 999)}"
+
+    # ===== STATEMENTS =====
+
+    def _block(self, indent: int) -> str:
+        count = self._random.randint(1, 6) if indent < 3 else self._random.randint(0, 2)
+        statements = [self._statement(indent) for _ in range(count)]
+        return "{\n" + "".join(statements) + "    " * (indent - 1) + "}"
+
+    def _statement(self, indent: int) -> str:
+        padding = "    " * indent
+        kind = self._random.random()
+        if kind < 0.3:
+            annotation = f": {self._type()}" if self._random.random() < 0.5 else ""
+            return f"{padding}let {self._name('v')}{annotation} = {self._expression()};\n"
+        if kind < 0.45 and indent < 4:
+            otherwise = f" else {self._block(indent + 1)}" if self._random.random() < 0.5 else ""
+            return f"{padding}if {self._expression()} {self._block(indent + 1)}{otherwise}\n"
+        if kind < 0.55 and indent < 4:
+            return f"{padding}while {self._expression()} {self._block(indent + 1)}\n"
+        if kind < 0.65:
+            return f"{padding}return {self._expression()};\n"
+        if kind < 0.7:
+            return f"{padding}// Update the state.\n"
+        if kind < 0.85:
+            return f"{padding}{self._postfix()} = {self._expression()};\n"
+        return f"{padding}{self._postfix()};\n"
+
+    # ===== EXPRESSIONS =====
+
+    def _expression(self) -> str:
+        self._depth += 1
+        try:
+            if self._depth > 3 or self._random.random() < 0.4:
+                return self._unary()
+            operator = self._random.choice(["||", "&&", "==", "!=", "<", "<=", ">", ">=", "+", "-", "*", "/"])
+            return f"{self._unary()} {operator} {self._expression()}"
+        finally:
+            self._depth -= 1
+
+    def _unary(self) -> str:
+        return f"{self._random.choice(['-', '!'])}{self._postfix()}" if self._random.random() < 0.1 else self._postfix()
+
+    def _postfix(self) -> str:
+        parts: List[str] = [self._primary()]
+        for _ in range(self._random.choice([0, 0, 0, 1, 1, 2])):
+            kind = self._random.random()
+            if kind < 0.4 and self._depth < 4:
+                parts.append("(" + ", ".join(self._expression() for _ in range(self._random.randint(0, 3))) + ")")
+            elif kind < 0.8:
+                parts.append(f".{self._name('m')}")
+            elif self._depth < 4:
+                parts.append(f"[{self._expression()}]")
+        return "".join(parts)
+
+    def _primary(self) -> str:
+        kind = self._random.random()
+        if kind < 0.4:
+            return self._name("v")
+        if kind < 0.65:
+            return str(self._random.randint(0, 100000)) if self._random.random() < 0.8 else f"{self._random.random() * 100:.3f}"
+        if kind < 0.75:
+            return f"\"text {self._random.randint(0, 999)}\""
+        if kind < 0.85:
+            return self._random.choice(["true", "false"])
+        if kind < 0.95 and self._depth < 4:
+            return f"({self._expression()})"
+        if self._depth < 4:
+            return "[" + ", ".join(self._expression() for _ in range(self._random.randint(0, 3))) + "]"
+        return self._name("v")
+
+
+__all__ = ["SampleSource"]
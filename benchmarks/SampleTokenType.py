@@ -0,0 +1,72 @@
+from SParLex.Lexer.Tokens import TokenType
+
+
+class SampleTokenType(TokenType):
+    """
+    SampleTokenType is the token set of the benchmarks' sample language, a small C-like language with keywords, regex
+    lexemes (including both kinds of comment), and single and multi-character operators, so every kind of token the
+    Lexer handles is exercised.
+    """
+
+    KwFn = "fn"
+    KwLet = "let"
+    KwIf = "if"
+    KwElse = "else"
+    KwWhile = "while"
+    KwReturn = "return"
+    KwStruct = "struct"
+    KwTrue = "true"
+    KwFalse = "false"
+
+    LxIdentifier = r"[A-Za-z_][A-Za-z0-9_]*"
+    LxNumber = r"[0-9]+(\.[0-9]+)?"
+    LxString = r"\"([^\"\\\n]|\\.)*\""
+    LxSingleLineComment = r"//[^\n]*"
+    LxMultiLineComment = r"/\*(.|\n)*?\*/"
+
+    TkArrow = "->"
+    TkEqEq = "=="
+    TkNotEq = "!="
+    TkLtEq = "<="
+    TkGtEq = ">="
+    TkAndAnd = "&&"
+    TkOrOr = "||"
+    TkLt = "<"
+    TkGt = ">"
+    TkEq = "="
+    TkPlus = "+"
+    TkMinus = "-"
+    TkStar = "*"
+    TkSlash = "/"
+    TkBang = "!"
+    TkDot = "."
+    TkComma = ","
+    TkColon = ":"
+    TkSemicolon = ";"
+    TkLParen = "("
+    TkRParen = ")"
+    TkLBrace = "{"
+    TkRBrace = "}"
+    TkLBrack = "["
+    TkRBrack = "]"
+    TkNewLine = "\n"
+    TkWhitespace = " "
+
+    @staticmethod
+    def single_line_comment_token() -> TokenType:
+        return SampleTokenType.LxSingleLineComment
+
+    @staticmethod
+    def multi_line_comment_token() -> TokenType:
+        return SampleTokenType.LxMultiLineComment
+
+    @staticmethod
+    def newline_token() -> TokenType:
+        return SampleTokenType.TkNewLine
+
+    @staticmethod
+    def whitespace_token() -> TokenType:
+        return SampleTokenType.TkWhitespace
+
+
+__all__ = ["SampleTokenType"]
@@ -0,0 +1,73 @@
+"""
+Checks that importing SParLex stays fast, for short-lived programs that only lex and parse a small file.
+
+SParLex is imported in a new interpreter with "-X importtime", and the time taken by its imports (not by the
+interpreter's own startup) is checked against a budget. Dependencies that are only needed for errors, or for async
+parsing, must not be imported at all until they're used, so any of them being imported fails the check too. Bytecode is
+written by a first, unmeasured import, so the budget measures loading SParLex rather than compiling it.
+
+Example:
+    - python benchmarks/import_budget.py
+    - python benchmarks/import_budget.py --budget-ms 50 --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_MODULES = ["SParLex.Lexer.Lexer", "SParLex.Parser.Parser"]
+_DEFERRED = ["asyncio", "colorama", "concurrent.futures", "ordered_set", "type_intersections"]
+
+
+def _import_times(src: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    # The cumulative microseconds of the top-level imports, and of every module imported, by one "import SParLex".
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")])))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    code = "import " + ", ".join(_MODULES)
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", code], check=True, capture_output=True, text=True, env=env)
+
+    top_level, modules = {}, {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that importing SParLex stays within a time budget.")
+    parser.add_argument("--budget-ms", type=float, default=75.0, help="the most the imports may take, in milliseconds")
+    parser.add_argument("--repeat", type=int, default=5, help="imports to measure (the fastest is checked)")
+    parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"), help="the directory containing the SParLex package")
+    args = parser.parse_args()
+    src = os.path.abspath(args.src)
+
+    _import_times(src)
+    runs = [_import_times(src) for _ in range(args.repeat)]
+    top_level, modules = min(runs, key=lambda run: sum(run[0].values()))
+    total_ms = sum(top_level.values()) / 1000
+
+    failures: List[str] = []
+    if total_ms > args.budget_ms:
+        failures.append(f"importing SParLex took {total_ms:.1f}ms, over the budget of {args.budget_ms:.1f}ms")
+    for name in _DEFERRED:
+        if name in modules:
+            failures.append(f"'{name}' was imported, but should only be imported once it's used")
+
+    print(f"Importing SParLex took {total_ms:.1f}ms (budget {args.budget_ms:.1f}ms). Slowest imports:")
+    for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"    {cumulative / 1000:>8.1f}ms  {name}")
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Checks that incremental lexing and parsing give the same results as lexing and parsing the edited code from scratch.
+
+Generated sample code is edited at random, a few characters at a time, and after each edit, Lexer.relex and
+Parser.reparse (with packrat parsing, and with FIRST-set prediction too) are compared against a new Lexer and a new
+Parser of the edited code: the tokens, the AST, or the error message if the code doesn't parse. The tokens of the
+reparsed AST must also have the spans and text of the edited code's, as reused ASTs are moved along from where they were
+parsed. Any difference fails the check.
+
+Example:
+    - python benchmarks/reparse_check.py
+    - python benchmarks/reparse_check.py --seed 3 --files 50 --edits 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from random import Random
+from typing import Any, Callable, Dict, List, Tuple
+
+_OPTIONS: List[Dict[str, Any]] = [{"packrat": True}, {"packrat": True, "predict": True}]
+_PIECES = ["fn", "let", "return", "x", "1", "\"s\"", " ", "\n", "=", ";", ":", ",", ".", "+", "(", ")", "{", "}", "[", "]", "/*", "*/"]
+
+
+def _outcome(parse: Callable[[], Any]) -> Tuple[str, Any]:
+    # The AST's repr and the AST, or the error message (and None) if the code doesn't parse.
+    from SParLex.Parser.ParserError import ParserError
+
+    try:
+        ast = parse()
+        return repr(ast), ast
+    except ParserError as e:
+        return f"error: {e}", None
+
+
+def _token_mismatch(ast: Any, tokens: Any) -> str | None:
+    # The first TokAst whose token doesn't have the span and text of the token at its position in "tokens".
+    from SParLex.Ast.AstWalker import AstWalker
+    from SParLex.Ast.TokAst import TokAst
+
+    for node in AstWalker.pre_order(ast):
+        if isinstance(node, TokAst) and node.pos >= 0 and node.token.source is not None:
+            token, expected = node.token, (tokens.starts[node.pos], tokens.ends[node.pos], tokens.text(node.pos))
+            if (token.start, token.end, token.token_metadata) != expected:
+                return f"the token at {node.pos} is {token.token_metadata!r} at {token.start}..{token.end}, not {expected[2]!r} at {expected[0]}..{expected[1]}"
+    return None
+
+
+def _check_file(seed: int, edits: int, options: Dict[str, Any], random: Random) -> List[str]:
+    from SParLex.Lexer.Lexer import Lexer
+    from SampleParser import SampleParser
+    from SampleSource import SampleSource
+    from SampleTokenType import SampleTokenType
+
+    tokens = Lexer(SampleSource(seed).generate(random.randint(200, 2000)), SampleTokenType).lex()
+    parser = SampleParser(SampleTokenType, tokens, "sample.txt", **options)
+    _outcome(parser.parse)
+
+    failures = []
+    for step in range(edits):
+        # Remove a few characters, and insert a few pieces of code in their place.
+        offset = random.randint(0, len(tokens.source))
+        removed = random.randint(0, min(4, len(tokens.source) - offset))
+        inserted = "".join(random.choice(_PIECES) for _ in range(random.randint(0, 2)))
+        edited, edit = Lexer.relex(tokens, offset, removed, inserted)
+        where = f"file {seed}, edit {step} ({offset}, -{removed}, +{inserted!r}), options {options}"
+
+        fresh = Lexer(edited.source, SampleTokenType).lex()
+        if (edited.kinds, edited.starts, edited.ends) != (fresh.kinds, fresh.starts, fresh.ends):
+            failures.append(f"{where}: the relexed tokens differ from the lexed ones")
+
+        reparsed, ast = _outcome(lambda: parser.reparse(edited, edit))
+        parsed, _ = _outcome(SampleParser(SampleTokenType, fresh, "sample.txt", **options).parse)
+        if reparsed != parsed:
+            failures.append(f"{where}: the reparse gives\n{reparsed[-400:]}\nbut a new parse gives\n{parsed[-400:]}")
+        elif ast is not None and (mismatch := _token_mismatch(ast, edited)) is not None:
+            failures.append(f"{where}: {mismatch}")
+        tokens = edited
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that relexing and reparsing match lexing and parsing from scratch.")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random edits")
+    parser.add_argument("--files", type=int, default=30, help="sample files to edit, for each set of parser options")
+    parser.add_argument("--edits", type=int, default=10, help="edits to make to each file")
+    parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"), help="the directory containing the SParLex package")
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.abspath(args.src))
+
+    random, failures = Random(args.seed), []
+    for options in _OPTIONS:
+        for seed in range(args.files):
+            failures += _check_file(seed, args.edits, options, random)
+
+    checked = len(_OPTIONS) * args.files * args.edits
+    print(f"Checked {checked} edits: {checked - len(failures)} matched.")
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
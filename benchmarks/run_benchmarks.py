@@ -0,0 +1,244 @@
+"""
+Benchmarks the throughput of the Lexer and the Parser on generated sample code, from 1KB up to 100MB, and of walking the
+parsed tree.
+
+Each size is measured in its own process, so the peak memory of one size isn't inflated by a previous one, and the cold
+import time is measured in fresh processes too. The results are written as JSON, and can be compared against a saved
+baseline, failing (with exit code 1) if any metric is worse than the baseline by more than the threshold. The sample
+language only uses long-standing parts of the SParLex API, so a baseline can be recorded from an older version with
+"--src path/to/old/src".
+
+Example:
+    - python benchmarks/run_benchmarks.py --sizes 1KB,1MB,100MB --output baseline.json
+    - python benchmarks/run_benchmarks.py --sizes 1KB,1MB --compare baseline.json --threshold 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+_SINGLE_RUN_SIZE = 4 << 20
+_IMPORT_CODE = (
+    "from time import perf_counter\n"
+    "start = perf_counter()\n"
+    "import SParLex.Lexer.Lexer, SParLex.Parser.Parser, SParLex.Utils.ErrorFormatter\n"
+    "print(perf_counter() - start)\n")
+
+
+def _parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit in sorted(_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * _UNITS[unit])
+    return int(text)
+
+
+def _format_size(size: int) -> str:
+    for unit in ["GB", "MB", "KB"]:
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _setup_path(src: str | None) -> None:
+    # Benchmark the given checkout, else the installed SParLex, else the one next to this script.
+    if src:
+        sys.path.insert(0, os.path.abspath(src))
+        return
+    try:
+        import SParLex.Lexer.Lexer
+    except ImportError:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+
+def _sparlex_path() -> str:
+    # The directory of the SParLex package being benchmarked (a namespace package, so without a "__file__").
+    import SParLex.Lexer.Lexer
+    return os.path.dirname(os.path.dirname(os.path.abspath(SParLex.Lexer.Lexer.__file__)))
+
+
+def _peak_memory() -> int:
+    # The peak resident set size of this process in bytes (ru_maxrss is in kilobytes on Linux, bytes on macOS).
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _time(func: Callable[[], Any], repeat: int) -> Tuple[List[float], Any]:
+    times, result = [], None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        times.append(perf_counter() - start)
+    return times, result
+
+
+def _result(name: str, size: int, metric: str, value: float, better: str) -> Dict[str, Any]:
+    return {"name": name, "size": size, "metric": metric, "value": value, "better": better}
+
+
+# ===== WORKERS =====
+
+def _run_size(size: int, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    # Measure one size of sample code. Run in a process of its own (see "--worker"), for its peak memory.
+    from SParLex.Lexer.Lexer import Lexer
+    from SParLex.Lexer.Tokens import SpecialToken
+    from SParLex.Parser.ParserError import ParserError
+    from SParLex.Utils.ErrorFormatter import ErrorFormatter
+    from SampleParser import SampleParser
+    from SampleSource import SampleSource
+    from SampleTokenType import SampleTokenType
+
+    repeat = 1 if size >= _SINGLE_RUN_SIZE else repeat
+    code = SampleSource(seed).generate(size)
+    failing_code, _ = SampleSource(seed).generate_failing(size)
+    memory_before = _peak_memory()
+
+    lex_times, tokens = _time(lambda: Lexer(code, SampleTokenType).lex(), repeat)
+    parse_times, ast = _time(lambda: SampleParser(SampleTokenType, tokens, "sample.txt").parse(), repeat)
+    memory_after = _peak_memory()
+    token_count = len(tokens)
+    walk_results = _walk(ast, size, repeat)
+    del tokens, ast
+
+    # Time how long a parse takes to fail, including formatting the error it raises.
+    failing_tokens = Lexer(failing_code, SampleTokenType).lex()
+    def parse_failing() -> None:
+        try:
+            SampleParser(SampleTokenType, failing_tokens, "sample.txt").parse()
+        except ParserError:
+            return
+        raise RuntimeError("The failing sample code parsed without an error.")
+    failing_times, _ = _time(parse_failing, repeat)
+
+    # Time formatting an error at the unlexable character, with a new ErrorFormatter each time (so nothing is cached).
+    error_pos = next(i for i, token in enumerate(failing_tokens) if token.token_type == SpecialToken.ERR)
+    format_times, _ = _time(lambda: ErrorFormatter(SampleTokenType, failing_tokens, "sample.txt").error(error_pos, "Unknown character", "Syntax Error"), max(repeat, 5))
+
+    return [
+        _result("lex", size, "seconds", min(lex_times), "lower"),
+        _result("lex", size, "tokens_per_second", token_count / statistics.median(lex_times), "higher"),
+        _result("parse", size, "seconds", min(parse_times), "lower"),
+        _result("parse", size, "tokens_per_second", token_count / statistics.median(parse_times), "higher"),
+        _result("lex_parse", size, "peak_memory_bytes", max(0, memory_after - memory_before), "lower"),
+        _result("parse_failing", size, "seconds", min(failing_times), "lower"),
+        _result("error_format", size, "seconds", min(format_times), "lower"),
+        _result("tokens", size, "count", token_count, "none"),
+        *walk_results]
+
+
+def _walk(ast: Any, size: int, repeat: int) -> List[Dict[str, Any]]:
+    # Time walking the parsed tree, and the same walk over an AstArena of it (skipped for versions without either).
+    try:
+        from SParLex.Ast.AstArena import AstArena
+        from SParLex.Ast.AstWalker import AstWalker
+    except ImportError:
+        return []
+    walk_times, _ = _time(lambda: sum(1 for _ in AstWalker.post_order(ast)), repeat)
+    arena = AstArena(ast)
+    arena_times, _ = _time(lambda: sum(1 for _ in arena.post_order()), repeat)
+    return [
+        _result("walk", size, "seconds", min(walk_times), "lower"),
+        _result("arena_walk", size, "seconds", min(arena_times), "lower"),
+        _result("nodes", size, "count", len(arena), "none")]
+
+
+def _run_worker(args: List[str]) -> List[Dict[str, Any]]:
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), *args], check=True, capture_output=True, text=True)
+    return json.loads(output.stdout)
+
+
+def _run_import(repeat: int) -> List[Dict[str, Any]]:
+    # Import SParLex in new interpreters (from wherever this process imported it), so nothing is imported already.
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(_sparlex_path()), env.get("PYTHONPATH")]))
+    times = [float(subprocess.run([sys.executable, "-c", _IMPORT_CODE], check=True, capture_output=True, text=True, env=env).stdout) for _ in range(repeat)]
+    return [_result("import", 0, "seconds", min(times), "lower")]
+
+
+# ===== REPORTING =====
+
+def _meta() -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+        sparlex_version = version("SParLex")
+    except Exception:
+        sparlex_version = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "sparlex_path": _sparlex_path(),
+        "sparlex_version": sparlex_version}
+
+
+def _compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    # Print each metric next to its baseline, and return the ones that regressed by more than the threshold.
+    previous = {(entry["name"], entry["size"], entry["metric"]): entry["value"] for entry in baseline}
+    regressions = []
+    print(f"{'benchmark':<36} {'baseline':>14} {'current':>14} {'change':>8}")
+    for entry in results:
+        key = (entry["name"], entry["size"], entry["metric"])
+        if entry["better"] == "none" or key not in previous or not previous[key]:
+            continue
+        change = entry["value"] / previous[key] - 1
+        worse = -change if entry["better"] == "higher" else change
+        label = f"{entry['name']} {_format_size(entry['size'])} {entry['metric']}" if entry["size"] else f"{entry['name']} {entry['metric']}"
+        flag = " REGRESSED" if worse > threshold else ""
+        print(f"{label:<36} {previous[key]:>14.6g} {entry['value']:>14.6g} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(label)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the SParLex Lexer and Parser on generated sample code.")
+    parser.add_argument("--sizes", default="1KB,10KB,100KB", help="comma separated code sizes, e.g. 1KB,1MB,100MB")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (sizes from 4MB run once)")
+    parser.add_argument("--seed", type=int, default=0, help="the seed the sample code is generated from")
+    parser.add_argument("--src", help="the directory containing the SParLex package to benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results against this JSON file of baseline results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="the fraction a metric may regress by before failing")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    _setup_path(args.src)
+
+    if args.worker is not None:
+        json.dump(_run_size(args.worker, args.repeat, args.seed), sys.stdout)
+        return 0
+
+    results = _run_import(args.repeat)
+    for size in map(_parse_size, args.sizes.split(",")):
+        print(f"Benchmarking {_format_size(size)}...", file=sys.stderr)
+        worker_args = ["--worker", str(size), "--repeat", str(args.repeat), "--seed", str(args.seed)]
+        results.extend(_run_worker(worker_args + (["--src", args.src] if args.src else [])))
+
+    report = {"meta": _meta(), "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if regressions := _compare(results, baseline, args.threshold):
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,24 @@
 from abc import ABC
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 
 
-@dataclass
+@dataclass(slots=True)
 class Ast(ABC):
     pos: int
+
+    # The position after the node's last token, recorded by the Parser when the rule that built the node returns it (so
+    # it includes the tokens the rule parsed but didn't keep). Not initialised by the __init__ of a subclass without
+    # slots, so it's read through "end_pos".
+    _end: int = field(default=-1, init=False, repr=False, compare=False)
+
+    @property
+    def end_pos(self) -> int:
+        # The position after the node's last token. A node the Parser didn't record the end of (one built inside a rule
+        # but not returned by it, or built outside a Parser) ends where its last child with tokens does, or at -1.
+        if (end := getattr(self, "_end", -1)) >= 0:
+            return end
+        for value in reversed([getattr(self, f.name, None) for f in fields(self)]):
+            for item in reversed(value) if isinstance(value, (list, tuple)) else [value]:
+                if isinstance(item, Ast) and (end := item.end_pos) >= 0:
+                    return end
+        return -1
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, List, Type
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.AstWalker import AstWalker
+
+
+class AstArena:
+    """
+    AstArena stores the shape of an AST in parallel arrays, with one row per node, rather than as a node object each.
+    A row holds the node's class (as an index into "types"), its position and end position (see Ast.end_pos), its
+    parent's row, and the size of its subtree. Rows are in pre-order, so a node's subtree is the range of rows from its
+    own, and its first child is the row after it. For a TokAst, the position is the index of its token, so its text is
+    read from the token list the tree was parsed from.
+
+    An arena takes a fraction of the memory of the tree it's built from, which can be released once it's built, and
+    whole-tree passes over it loop over integers instead of following references between objects.
+
+    Example:
+        - arena = AstArena(parser.parse())
+        - for node in arena.pre_order(): ... -> every row (a range, so the tree isn't walked)
+        - for node in arena.of_type(FunctionAst): arena.subtree(node) -> the rows of every function
+    """
+
+    __slots__ = ["types", "kinds", "positions", "ends", "parents", "sizes"]
+
+    types: List[Type[Ast]]
+    kinds: array
+    positions: array
+    ends: array
+    parents: array
+    sizes: array
+
+    def __init__(self, root: Ast) -> None:
+        self.types = []
+        self.kinds = array("H")
+        self.positions = array("i")
+        self.ends = array("i")
+        self.parents = array("i")
+        kinds: Dict[type, int] = {}
+
+        # Number the rows in pre-order, with the stack holding each node to come paired with its parent's row.
+        accessors, stack = AstWalker._accessors, [(root, -1)]
+        pop, extend = stack.pop, stack.extend
+        add_kind, add_position, add_end, add_parent = self.kinds.append, self.positions.append, self.ends.append, self.parents.append
+        row = 0
+        while stack:
+            node, parent = pop()
+            if (kind := kinds.get(node.__class__)) is None:
+                kind = kinds[node.__class__] = len(self.types)
+                self.types.append(node.__class__)
+            children = accessors[node.__class__](node)
+            add_kind(kind)
+            add_position(node.pos)
+            add_end(getattr(node, "_end", -1) if children else node.end_pos)
+            add_parent(parent)
+            if children:
+                extend([(child, row) for child in reversed(children)])
+            row += 1
+
+        # Every row comes after its parent's, so adding each subtree's size to its parent's, from the last row back,
+        # completes each parent's size before it's added to its own parent's. The end of a node the Parser didn't record
+        # the end of is found from its children then too, rather than recursively by "end_pos".
+        self.sizes = sizes = array("I", [0]) * row
+        ends, parents = self.ends, self.parents
+        for node in range(row - 1, -1, -1):
+            sizes[node] += 1
+            if ends[node] < 0:
+                for child in self.children(node):
+                    if ends[child] >= 0:
+                        ends[node] = ends[child]
+            if (parent := parents[node]) >= 0:
+                sizes[parent] += sizes[node]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def type(self, node: int) -> Type[Ast]:
+        return self.types[self.kinds[node]]
+
+    def children(self, node: int) -> Iterator[int]:
+        # Each child's subtree ends where the next child's row is.
+        child, end = node + 1, node + self.sizes[node]
+        sizes = self.sizes
+        while child < end:
+            yield child
+            child += sizes[child]
+
+    def subtree(self, node: int) -> range:
+        return range(node, node + self.sizes[node])
+
+    def pre_order(self) -> range:
+        return range(len(self.kinds))
+
+    def post_order(self) -> Iterator[int]:
+        # A node is yielded once the rows reach the end of its subtree, which is after every row in it.
+        sizes, open_nodes = self.sizes, []
+        for node in range(len(self.kinds)):
+            while open_nodes and open_nodes[-1] + sizes[open_nodes[-1]] <= node:
+                yield open_nodes.pop()
+            open_nodes.append(node)
+        while open_nodes:
+            yield open_nodes.pop()
+
+    def of_type(self, *types: Type[Ast]) -> Iterator[int]:
+        # The rows of the nodes of any of the types, or of their subclasses.
+        wanted = {kind for kind, cls in enumerate(self.types) if issubclass(cls, types)}
+        return (node for node, kind in enumerate(self.kinds) if kind in wanted)
+
+
+__all__ = ["AstArena"]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import Callable, ClassVar, Dict, Optional, Tuple
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.AstWalker import AstWalker
+
+
+type Handlers = Tuple[Optional[Callable[[AstVisitor, Ast], Optional[bool]]], Optional[Callable[[AstVisitor, Ast], None]]]
+
+
+class _Handlers(dict):
+    # The "visit_" and "leave_" methods of one visitor class for each Ast class, looked up once per Ast class.
+    def __init__(self, visitor: type) -> None:
+        super().__init__()
+        self._visitor = visitor
+
+    def __missing__(self, cls: type) -> Handlers:
+        self[cls] = handlers = (self._find(cls, "visit_"), self._find(cls, "leave_"))
+        return handlers
+
+    def _find(self, cls: type, prefix: str) -> Optional[Callable]:
+        # The method for the nearest class in the Ast class's MRO (so "visit_Ast" handles every node without its own).
+        for base in cls.__mro__:
+            if (method := getattr(self._visitor, prefix + base.__name__, None)) is not None:
+                return method
+        return None
+
+
+class AstVisitor:
+    """
+    AstVisitor is the base of a pass over an AST. A subclass defines "visit_<class name>" methods, called for a node
+    before its children, and "leave_<class name>" methods, called after them. A node without a method of its own class's
+    name is handled by the method of its nearest base class, and is otherwise only walked through. If a "visit_" method
+    returns False, the node's children are skipped (its "leave_" method is still called).
+
+    The tree is walked with an explicit stack (see AstWalker), so passes don't overflow the recursion limit on deeply
+    nested trees, and the methods for each Ast class are looked up once per visitor class.
+
+    Example:
+        - class NameCollector(AstVisitor):
+              def visit_IdentifierAst(self, ast): self.names.append(ast.name)
+              def visit_FunctionAst(self, ast): return ast.is_public
+        - NameCollector().visit(root)
+    """
+
+    _handlers: ClassVar[Dict[type, Handlers]]
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._handlers = _Handlers(cls)
+
+    def visit(self, ast: Ast) -> None:
+        # A node whose "leave_" method is due is pushed under its children, paired with the method.
+        accessors, handlers, stack = AstWalker._accessors, self._handlers, [ast]
+        pop, append, extend = stack.pop, stack.append, stack.extend
+        while stack:
+            node = pop()
+            if node.__class__ is tuple:
+                node[0](self, node[1])
+                continue
+
+            enter, leave = handlers[node.__class__]
+            descend = enter is None or enter(self, node) is not False
+            children = accessors[node.__class__](node) if descend else None
+            if leave is not None:
+                if not children:
+                    leave(self, node)
+                    continue
+                append((leave, node))
+            if children:
+                children.reverse()
+                extend(children)
+
+
+AstVisitor._handlers = _Handlers(AstVisitor)
+
+
+__all__ = ["AstVisitor"]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from dataclasses import fields
+from typing import Callable, ClassVar, Dict, Iterator, List, Tuple
+
+from SParLex.Ast.Ast import Ast
+
+
+class _AstTypes(dict):
+    # Whether each class is an Ast subclass, checked once per class: "isinstance" against Ast (an ABC) is much slower
+    # than a dictionary lookup.
+    def __missing__(self, cls: type) -> bool:
+        self[cls] = is_ast = issubclass(cls, Ast)
+        return is_ast
+
+
+class _Accessors(dict):
+    # The children accessor of each Ast subclass, generated the first time a node of the class is walked.
+    def __missing__(self, cls: type) -> Callable[[Ast], List[Ast]]:
+        self[cls] = accessor = _generate_accessor(cls)
+        return accessor
+
+
+def _generate_accessor(cls: type) -> Callable[[Ast], List[Ast]]:
+    # A function reading each field of the class directly (fields that __init__ doesn't set may be missing), keeping the
+    # values that are Asts, and the Asts in values that are lists or tuples.
+    lines = ["def children(node):", "    result = []"]
+    for field in fields(cls):
+        if field.name in ("pos", "_end"):
+            continue
+        read = f"node.{field.name}" if field.init else f"getattr(node, {field.name!r}, None)"
+        lines += [
+            f"    value = {read}",
+            f"    kind = value.__class__",
+            f"    if is_ast[kind]:",
+            f"        result.append(value)",
+            f"    elif kind is list or kind is tuple:",
+            f"        result.extend([item for item in value if is_ast[item.__class__]])"]
+    lines.append("    return result")
+
+    namespace = {"is_ast": AstWalker._is_ast}
+    exec(compile("\n".join(lines), f"<children of {cls.__qualname__}>", "exec"), namespace)
+    return namespace["children"]
+
+
+class AstWalker:
+    """
+    AstWalker walks ASTs with an explicit stack rather than recursion, so a tree of any depth can be walked. The children
+    of a node are its fields holding Asts, and the Asts in its fields holding lists or tuples, in the order the fields
+    are declared. They are read by an accessor generated for each Ast subclass the first time one of its nodes is walked,
+    so walking a node doesn't call "dataclasses.fields" or "getattr".
+
+    Example:
+        - AstWalker.children(ast) -> the children of "ast"
+        - for ast in AstWalker.pre_order(root): ... -> every node of the tree, each before its children
+        - for ast in AstWalker.post_order(root): ... -> every node of the tree, each after its children
+    """
+
+    _is_ast: ClassVar[Dict[type, bool]] = _AstTypes()
+    _accessors: ClassVar[Dict[type, Callable[[Ast], List[Ast]]]] = _Accessors()
+
+    @staticmethod
+    def children(ast: Ast) -> List[Ast]:
+        return AstWalker._accessors[ast.__class__](ast)
+
+    @staticmethod
+    def pre_order(ast: Ast) -> Iterator[Ast]:
+        # Children are pushed in reverse, so the first child is walked first.
+        accessors, stack = AstWalker._accessors, [ast]
+        pop, extend = stack.pop, stack.extend
+        while stack:
+            node = pop()
+            yield node
+            children = accessors[node.__class__](node)
+            if children:
+                children.reverse()
+                extend(children)
+
+    @staticmethod
+    def post_order(ast: Ast) -> Iterator[Ast]:
+        # A node is pushed again (as a 1-tuple) under its children, and yielded when it's popped the second time.
+        accessors, stack = AstWalker._accessors, [ast]
+        pop, append, extend = stack.pop, stack.append, stack.extend
+        while stack:
+            node = pop()
+            if node.__class__ is tuple:
+                yield node[0]
+                continue
+            children = accessors[node.__class__](node)
+            if not children:
+                yield node
+                continue
+            append((node,))
+            children.reverse()
+            extend(children)
+
+    @staticmethod
+    def parents(ast: Ast) -> Iterator[Tuple[Ast, Ast | None]]:
+        # Every node of the tree in pre-order, with its parent (None for "ast" itself).
+        accessors, stack = AstWalker._accessors, [(ast, None)]
+        pop, extend = stack.pop, stack.extend
+        while stack:
+            node, parent = pop()
+            yield node, parent
+            children = accessors[node.__class__](node)
+            if children:
+                extend([(child, node) for child in reversed(children)])
+
+
+__all__ = ["AstWalker"]
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.TokAst import TokAst
+
+
+@dataclass(slots=True)
+class BinaryAst(Ast):
+    lhs: Ast
+    op: TokAst
+    rhs: Ast
@@ -0,0 +1,17 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, TYPE_CHECKING
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.TokAst import TokAst
+
+if TYPE_CHECKING:
+    from SParLex.Parser.ParserError import ParserErrors
+
+
+# Stands in for an item of a repetition that a recovering Parser skipped because of a syntax error in it (see Parser),
+# holding the error, and the tokens from the item's start up to and including the sync token it resumed after.
+@dataclass(slots=True)
+class ErrorAst(Ast):
+    error: ParserErrors.SyntaxError
+    skipped: List[TokAst]
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import Any
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.TokAst import TokAst
+
+
+@dataclass(slots=True)
+class PostfixAst(Ast):
+    lhs: Ast
+    op: TokAst
+    suffix: Any = None
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Ast.TokAst import TokAst
+
+
+@dataclass(slots=True)
+class PrefixAst(Ast):
+    op: TokAst
+    rhs: Ast
@@ -1,10 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List
 
 from SParLex.Ast.Ast import Ast
 from SParLex.Ast.TokAst import TokAst
 
 
-@dataclass
+@dataclass(slots=True)
 class RootAst(Ast):
     root_ast: Ast
     eof_token: TokAst
+
+    # After a recovering Parser skipped tokens at the top level (see Parser), the ASTs parsed after the first root: an
+    # ErrorAst for each run of tokens skipped, and each root parsed again after them. Empty for any other parse, so it's
+    # left out of the repr.
+    recovered: List[Ast] = field(default_factory=list, repr=False)
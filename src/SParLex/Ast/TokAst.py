@@ -1,14 +1,19 @@
 from __future__ import annotations
 from dataclasses import dataclass
 
-from SParLex.Lexer.Tokens import Token, TokenType
+from SParLex.Lexer.Tokens import SpecialToken, Token, TokenType
 from SParLex.Ast.Ast import Ast
 
 
-@dataclass
+@dataclass(slots=True)
 class TokAst(Ast):
     token: Token
 
+    @property
+    def end_pos(self) -> int:
+        # A token's AST always covers just its token (or nothing, for the "no token"). A dummy has no position.
+        return self.pos + (self.token.token_type is not SpecialToken.NO_TOK) if self.pos >= 0 else -1
+
     @staticmethod
     def dummy(token_type: TokenType, info=None, pos=-1) -> TokAst:
         # Quick way to create a token ast for a given token type.
@@ -1,3 +1,10 @@
 from SParLex.Ast.Ast import Ast
+from SParLex.Ast.AstArena import AstArena
+from SParLex.Ast.AstVisitor import AstVisitor
+from SParLex.Ast.AstWalker import AstWalker
+from SParLex.Ast.BinaryAst import BinaryAst
+from SParLex.Ast.ErrorAst import ErrorAst
+from SParLex.Ast.PostfixAst import PostfixAst
+from SParLex.Ast.PrefixAst import PrefixAst
 from SParLex.Ast.RootAst import RootAst
 from SParLex.Ast.TokAst import TokAst
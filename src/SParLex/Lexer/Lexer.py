@@ -1,70 +1,383 @@
+from __future__ import annotations
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.TokenEdit import TokenEdit
 from SParLex.Lexer.Tokens import Token, TokenType, SpecialToken
-from fastenum import Enum
-from type_intersections import Intersection
+from SParLex.Lexer.TokenStream import TokenStream
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import partial
+from typing import BinaryIO, Iterable, Iterator, Optional, TextIO, Tuple, TYPE_CHECKING
+import codecs
 import re
 
+# Only needed for annotations, and slow to import (asyncio itself is imported by alex, the only method that uses it).
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from fastenum import Enum
+    from mmap import mmap
+    from SParLex.Utils.Profiler import Profiler
+    from type_intersections import Intersection
+
+
+type Source = str | TextIO | BinaryIO | mmap | Iterable[str | bytes]
+
 
 class Lexer:
     """
     The Lexer class analyses the input code and returns a list of tokens. The code and the token set must be specified
-    in the constructor. The lex method is called to perform the lexical analysis and return the list of tokens. Custom
-    token sets can be created by subclassing TokenType and passing the subclass to the Lexer constructor.
+    in the constructor. The lex method is called to perform the lexical analysis and return the list of tokens, as a
+    compact TokenStream. Custom token sets can be created by subclassing TokenType and passing the subclass to the Lexer
+    constructor.
+
+    Every keyword, lexeme and token is compiled into one anchored alternation of named groups, in priority order
+    (keywords, then lexemes, then tokens longest-first), so each position is matched with a single regex call. The
+    compiled form of a token set is a LexerTable, which is built once and shared by all Lexers for that token set.
+
+    The code can also be a text or binary file, a memory-mapped file or an iterable of chunks. The iter_tokens method
+    lexes these lazily, holding only a bounded window of the source in memory rather than the whole of it. After an edit
+    to the source, relex re-lexes only the part of a TokenStream that the edit could have changed. Given a Profiler, lex
+    and iter_tokens count the match attempts of every token type.
 
     Example:
         - tokens = Lexer("let x = 5;", MyTokenType).lex()
+        - for token in Lexer(open("main.spp"), MyTokenType).iter_tokens(): ...
+        - tokens, edit = Lexer.relex(tokens, offset=8, removed=1, inserted="6")
     """
 
-    _code: str
+    _source: Source
     _token_class: Intersection[type[Enum], type[TokenType]]
+    _table: LexerTable
+    _profiler: Optional[Profiler]
 
-    def __init__(self, code: str, token_set: Intersection[type[Enum], type[TokenType]] = TokenType) -> None:
-        self._code = code.replace("\t", "    ")
+    def __init__(self, code: Source, token_set: Intersection[type[Enum], type[TokenType]] = TokenType, profiler: Optional[Profiler] = None) -> None:
+        self._source = code
         self._token_class = token_set
-        self._token_class._member_map_.update(SpecialToken._member_map_)
+        self._table = LexerTable.of(token_set)
+        self._profiler = profiler
 
-    def lex(self):
-        current = 0
-        output = []
+    def _chunks(self, chunk_size: int, encoding: str) -> Iterator[str]:
+        # Yield the source as tab-expanded text. Binary chunks are decoded incrementally, so a multibyte character split
+        # across two chunks is decoded correctly.
+        source = self._source
+        if isinstance(source, str):
+            yield source.replace("\t", "    ")
+            return
 
-        tokens   = [t for t in self._token_class._member_map_ if t[:2] == "Tk"]
-        keywords = [t for t in self._token_class._member_map_ if t[:2] == "Kw"]
-        lexemes  = [t for t in self._token_class._member_map_ if t[:2] == "Lx"]
+        decoder = codecs.getincrementaldecoder(encoding)()
+        chunks = iter(partial(source.read, chunk_size), source.read(0)) if hasattr(source, "read") else source
+        for chunk in chunks:
+            yield (chunk if isinstance(chunk, str) else decoder.decode(chunk)).replace("\t", "    ")
+        if tail := decoder.decode(b"", final=True):
+            yield tail.replace("\t", "    ")
 
-        tokens.sort(key=lambda t: len(self._token_class[t].value), reverse=True)
-        keywords.sort(key=lambda t: len(self._token_class[t].value), reverse=True)
+    def text(self, encoding: str = "utf-8") -> str:
+        # The whole source, as the text the tokens' offsets refer to (ie with tabs expanded).
+        return "".join(self._chunks(1 << 16, encoding))
 
-        available_tokens = keywords + lexemes + tokens
+    def lex(self) -> TokenStream:
+        code = self.text()
+        output = TokenStream(code, self._table)
+        output.append(self._table.newline, 0, 0)
+        self._lex_span(code, 0, len(code), output)
+        output.append(SpecialToken.EOF, len(code), len(code))
+        return output
 
-        while current < len(self._code):
-            for token in available_tokens:
-                value = getattr(self._token_class, token).value
-                upper = current + len(value)
+    async def alex(self, chunk_size: int = 1 << 12, executor: Optional[Executor] = None) -> TokenStream:
+        """
+        Lex as lex does, without blocking an asyncio event loop: the source is lexed "chunk_size" characters at a time,
+        yielding to the loop between chunks, so cancelling the task stops lexing at the next chunk. Given an executor,
+        the source is lexed there instead, by a new Lexer (without the Profiler), and a process pool sends the tokens
+        back as their compact arrays. Cancelling then stops waiting for it, but a lex already running finishes.
 
-                # Keywords: Match the keyword, and check that the next character isn't [A-Za-z_] (identifier).
-                if token[:2] == "Kw" and self._code[current:upper] == value and not (self._code[upper].isalpha() or self._code[upper] == "_"):
-                    output.append(Token(value, self._token_class[token]))
-                    current += len(value)
-                    break
+        Example:
+            - tokens = await Lexer(code, MyTokenType).alex()
+        """
 
-                # Lexemes: Match a lexeme by attempting to get a regex match against the current code. Discard comments.
-                elif token[:2] == "Lx" and (matched := re.match(value, self._code[current:])):
-                    if self._token_class[token] not in [self._token_class.single_line_comment_token(), self._token_class.multi_line_comment_token()]:
-                        output.append(Token(matched.group(0), self._token_class[token]))
-                    if self._token_class[token] == self._token_class.multi_line_comment_token():
-                        output.extend([Token("\n", self._token_class.newline_token())] * matched.group(0).count("\n"))
-                    current += len(matched.group(0))
-                    break
+        import asyncio
+
+        code = self.text()
+        if executor is not None:
+            return await asyncio.get_running_loop().run_in_executor(executor, _lex, code, self._token_class)
+
+        output = TokenStream(code, self._table)
+        output.append(self._table.newline, 0, 0)
+        current = 0
+        while current < len(code):
+            current = self._lex_span(code, current, min(current + chunk_size, len(code)), output)
+            await asyncio.sleep(0)
+        output.append(SpecialToken.EOF, len(code), len(code))
+        return output
 
-                # Tokens: Match the token and increment the counter by the length of the token.
-                elif token[:2] == "Tk" and self._code[current:upper] == value:
-                    output.append(Token(value, self._token_class[token]))
-                    current += len(value)
+    def _lex_span(self, code: str, current: int, end: int, output: TokenStream) -> int:
+        # Lex the tokens starting from "current" up to "end" into the output, returning where the next token starts. The
+        # last token may run past "end", so lexing the source in spans gives the same tokens as lexing it all at once.
+        append = output.append
+        dispatch, default, names = self._table.dispatch, self._table.default, self._table.names
+        if self._profiler is not None:
+            dispatch, default = self._profiler._instrument(self._table)
+
+        single_line_comment = self._table.single_line_comment
+        multi_line_comment = self._table.multi_line_comment
+        newline = self._table.newline
+
+        while current < end:
+            for pattern, token_type, sliced in dispatch.get(code[current], default):
+                if matched := (pattern.match(code[current:]) if sliced else pattern.match(code, current)):
                     break
 
             else:
                 # Use n error token here, so that the error checker can use the same code to format the error when some
                 # rule fails to parse, rather than trying to raise an error from here.
-                output += [Token(self._code[current], SpecialToken.ERR)]
+                append(SpecialToken.ERR, current, current + 1)
+                current += 1
+                continue
+
+            # Discard comments, but keep the newlines inside multi-line comments so line numbers are preserved.
+            token_type = token_type or names[matched.lastgroup]
+            upper = current + len(matched.group(0)) if sliced else matched.end()
+            if token_type is not single_line_comment and token_type is not multi_line_comment:
+                append(token_type, current, upper)
+            if token_type is multi_line_comment:
+                for _ in range(code.count("\n", current, upper)):
+                    append(newline, upper, upper)
+            current = upper
+        return current
+
+    @classmethod
+    def relex(cls, tokens: TokenStream, offset: int, removed: int, inserted: str) -> Tuple[TokenStream, TokenEdit]:
+        """
+        Re-lex a TokenStream after replacing the "removed" characters at "offset" in its source with the "inserted" text.
+        The offset is into the TokenStream's source (which has its tabs expanded). The result is the same as lexing the
+        edited source from scratch, along with the TokenEdit describing which tokens changed.
+
+        Lexing restarts at the last token starting before the line of the edit: a match attempted on an earlier line
+        can't have read the edited text, unless it's an attempt that could read past a newline (see LexerTable), which
+        are re-checked, and move the restart back if their result changes. Lexing stops as soon as a token after the
+        edit starts where a token started before the edit, as the rest of the stream is then the same, only moved.
+        """
+
+        source = tokens.source
+        inserted = inserted.replace("\t", "    ")
+        lexer = cls(source[:offset] + inserted + source[offset + removed:], tokens.table.token_set)
+        return lexer._relex(tokens, offset, offset + len(inserted), len(inserted) - removed)
+
+    def _relex(self, tokens: TokenStream, offset: int, edit_end: int, shift: int) -> Tuple[TokenStream, TokenEdit]:
+        current = self._restart(tokens, offset)
+        start = self._first_token_from(tokens, current)
+        code = self._source
+        length = len(code)
+        output = TokenStream(code, self._table)
+        _extend(output.kinds, tokens.kinds[:start])
+        _extend(output.starts, tokens.starts[:start])
+        _extend(output.ends, tokens.ends[:start])
+
+        append = output.append
+        dispatch, default, names = self._table.dispatch, self._table.default, self._table.names
+
+        single_line_comment = self._table.single_line_comment
+        multi_line_comment = self._table.multi_line_comment
+        newline = self._table.newline
+
+        resync = None
+        while True:
+            # Past the edit (and the character before a token, which "\b" can see), stop once the old and new tokens
+            # start at the same place.
+            if current > edit_end and (resync := self._resync_index(tokens, current - shift)) is not None:
+                break
+            if current >= length:
+                break
+
+            for pattern, token_type, sliced in dispatch.get(code[current], default):
+                if matched := (pattern.match(code[current:]) if sliced else pattern.match(code, current)):
+                    break
+
+            else:
+                append(SpecialToken.ERR, current, current + 1)
                 current += 1
+                continue
+
+            token_type = token_type or names[matched.lastgroup]
+            upper = current + len(matched.group(0)) if sliced else matched.end()
+            if token_type is not single_line_comment and token_type is not multi_line_comment:
+                append(token_type, current, upper)
+            if token_type is multi_line_comment:
+                for _ in range(code.count("\n", current, upper)):
+                    append(newline, upper, upper)
+            current = upper
+
+        # Copy the rest of the old stream, moved along by the change in length, or finish the stream.
+        new_end = len(output)
+        if resync is None:
+            append(SpecialToken.EOF, length, length)
+            resync = len(tokens)
+        else:
+            _extend(output.kinds, tokens.kinds[resync:])
+            output.starts.extend(map(shift.__add__, tokens.starts[resync:]))
+            output.ends.extend(map(shift.__add__, tokens.ends[resync:]))
+        return output, TokenEdit(start, resync, new_end if resync < len(tokens) else len(output))
+
+    def _restart(self, tokens: TokenStream, offset: int) -> int:
+        # The position to re-lex from: the start of the last token starting before the newline preceding the edit.
+        source, starts, ends = tokens.source, tokens.starts, tokens.ends
+        newline = source.rfind("\n", 0, offset)
+        multi_line_starts = self._table.multi_line_starts
+        if newline < 0 or multi_line_starts is None:
+            return 0
+
+        index = bisect_right(starts, newline) - 1
+        while index > 0 and starts[index] == ends[index]:
+            index -= 1
+        restart = starts[index] if index > 0 else 0
+        if not multi_line_starts:
+            return restart
+
+        # Re-check every earlier attempt that could have read past a newline, ie at a token start (or in the gap left by
+        # discarded comments) whose character starts a multi-line alternative. The first whose result has changed is
+        # where re-lexing has to restart instead.
+        checked = 0
+        candidates = re.compile(f"[{re.escape(''.join(sorted(multi_line_starts)))}]")
+        for candidate in candidates.finditer(source, 0, restart):
+            position = candidate.start()
+            index = bisect_right(starts, position) - 1
+            if position < checked or ends[index] > position and starts[index] != position:
+                continue
+
+            attempt = starts[index] if ends[index] > position else ends[index]
+            while attempt <= position:
+                old_result = self._attempt(source, attempt)
+                if old_result != self._attempt(self._source, attempt):
+                    return attempt
+                attempt = old_result[1]
+            checked = attempt
+        return restart
+
+    def _attempt(self, code: str, current: int) -> Tuple[TokenType | SpecialToken, int]:
+        # Match one token at the position, returning its type and end, as lex would.
+        for pattern, token_type, sliced in self._table.dispatch.get(code[current], self._table.default):
+            if matched := (pattern.match(code[current:]) if sliced else pattern.match(code, current)):
+                token_type = token_type or self._table.names[matched.lastgroup]
+                return token_type, current + len(matched.group(0)) if sliced else matched.end()
+        return SpecialToken.ERR, current + 1
+
+    @staticmethod
+    def _first_token_from(tokens: TokenStream, position: int) -> int:
+        # The index of the first token lexed from the position onwards. The newlines of a multi-line comment ending at
+        # the position (and the leading newline) have an empty span there, but were lexed before it.
+        index = bisect_left(tokens.starts, position)
+        eof = tokens.table.ordinals[SpecialToken.EOF]
+        while index < len(tokens) and tokens.starts[index] == position == tokens.ends[index] and tokens.kinds[index] != eof:
+            index += 1
+        return index
+
+    @staticmethod
+    def _resync_index(tokens: TokenStream, position: int) -> Optional[int]:
+        # The index of the old token lexed at the position, if lexing did start a token there (rather than, say, inside
+        # a comment), in which case the rest of the old stream is what lexing from there would produce.
+        index = Lexer._first_token_from(tokens, position)
+        if index < len(tokens) and tokens.starts[index] == position:
+            return index
+        return None
+
+    def iter_tokens(self, chunk_size: int = 1 << 16, lookahead: int = 1 << 20, encoding: str = "utf-8") -> Iterator[Token]:
+        """
+        Lazily yield the same tokens as lex, reading the source in chunks. At least "lookahead" characters past the
+        current position are kept buffered (or the rest of the source), and a match attempt that could depend on text
+        past the buffer reads more for that attempt only:
+            - An attempt that can't read past the next newline (see LexerTable.multi_line_starts) is exact once the
+              buffer reaches that newline, so a long line is read up to its end.
+            - Any other attempt (ie at the start of a multi-line comment) is matched against twice as much text, and
+              again against twice that, until the result stops changing and doesn't reach the end of the text it was
+              matched against.
+        So tokens longer than the lookahead are lexed as lex would lex them. The one case left is a multi-line token
+        that fails to match against more than twice the lookahead but would match against the whole source, so the
+        lookahead should still be longer than the longest multi-line comment.
+        """
+
+        chunks = self._chunks(chunk_size, encoding)
+        buffer, current, exhausted, line_end = "", 0, False, -1
+        dispatch, default, names = self._table.dispatch, self._table.default, self._table.names
+        if self._profiler is not None:
+            dispatch, default = self._profiler._instrument(self._table)
+
+        single_line_comment = self._table.single_line_comment
+        multi_line_comment = self._table.multi_line_comment
+        multi_line_starts = self._table.multi_line_starts
+        newline = self._table.newline
+
+        def fill(size: int) -> Tuple[str, bool]:
+            # The unconsumed part of the buffer, topped up to "size" characters (or the rest of the source), and whether
+            # it is the rest of the source. Discarding the consumed prefix keeps memory bounded.
+            pending = [buffer[current:]]
+            length = len(pending[0])
+            while length < size and (chunk := next(chunks, None)) is not None:
+                pending.append(chunk)
+                length += len(chunk)
+            return "".join(pending), length < size
+
+        def attempt(end: int) -> Optional[Tuple[TokenType | SpecialToken, str]]:
+            # Match one token at the current position against the buffer up to "end", returning its type and text.
+            for pattern, token_type, sliced in dispatch.get(buffer[current], default):
+                if matched := (pattern.match(buffer[current:end]) if sliced else pattern.match(buffer, current, end)):
+                    return token_type or names[matched.lastgroup], matched.group(0)
+            return None
+
+        yield Token("\n", newline)
+        while True:
+            if not exhausted and len(buffer) - current < lookahead:
+                (buffer, exhausted), current, line_end = fill(2 * lookahead), 0, -1
+
+            if current >= len(buffer):
+                break
+
+            if exhausted:
+                result = attempt(len(buffer))
+
+            elif multi_line_starts is not None and buffer[current] not in multi_line_starts:
+                # Read up to the next newline, as the attempt depends on nothing after it.
+                if line_end <= current:
+                    line_end, window = buffer.find("\n", current + 1), len(buffer) - current
+                    while line_end < 0 and not exhausted:
+                        window *= 2
+                        (buffer, exhausted), current = fill(window), 0
+                        line_end = buffer.find("\n", current + 1)
+                result = attempt(len(buffer))
+
+            else:
+                # Widen the text matched against until the result is stable.
+                window = lookahead
+                result = attempt(current + window)
+                while not exhausted:
+                    if len(buffer) - current < 2 * window:
+                        (buffer, exhausted), current, line_end = fill(2 * window), 0, -1
+                    wider = attempt(current + 2 * window)
+                    if wider == result and (result is None or len(result[1]) < window):
+                        break
+                    window, result = 2 * window, wider
+
+            if result is None:
+                yield Token(buffer[current], SpecialToken.ERR)
+                current += 1
+                continue
+
+            token_type, metadata = result
+            if token_type is not single_line_comment and token_type is not multi_line_comment:
+                yield Token(metadata, token_type)
+            if token_type is multi_line_comment:
+                for _ in range(metadata.count("\n")):
+                    yield Token("\n", newline)
+            current += len(metadata)
+
+        yield Token("<EOF>", SpecialToken.EOF)
+
+
+def _lex(code: str, token_set: Intersection[type[Enum], type[TokenType]]) -> TokenStream:
+    # Runs in the executor of Lexer.alex.
+    return Lexer(code, token_set).lex()
+
+
+def _extend(target: array, values: array) -> None:
+    # Extend an offset array by another, which may use a different typecode if one source is much longer.
+    target.extend(values) if target.typecode == values.typecode else target.fromlist(values.tolist())
+
 
-        return [Token("\n", self._token_class.newline_token())] + output + [Token("<EOF>", SpecialToken.EOF)]
+__all__ = ["Lexer"]
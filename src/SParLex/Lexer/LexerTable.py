@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+from functools import cache
+from threading import Lock
+from types import MappingProxyType
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Optional, Tuple
+import re
+import sys
+
+from SParLex.Lexer.Tokens import SpecialToken, TokenType
+
+
+type Segment = Tuple[re.Pattern, Optional[TokenType], bool]
+
+# The analysis of lexemes parses them with the private "re._parser" module, which may change between Python versions.
+# Without it (or if it fails on a lexeme), lexemes are analysed conservatively from their compiled form instead.
+try:
+    from re import _constants, _parser
+
+    # The anchors whose result depends on the character before the position they're tested at.
+    _SLICED_ANCHORS = frozenset({
+        _constants.AT_BEGINNING, _constants.AT_BEGINNING_STRING, _constants.AT_BOUNDARY, _constants.AT_NON_BOUNDARY,
+        _constants.AT_UNI_BOUNDARY, _constants.AT_UNI_NON_BOUNDARY, _constants.AT_LOC_BOUNDARY,
+        _constants.AT_LOC_NON_BOUNDARY})
+except (ImportError, AttributeError):
+    _constants = _parser = None
+
+
+@cache
+def _keyword_boundary() -> str:
+    # A keyword can't be followed by a character for which "str.isalpha()" holds, or "_". The regex "[^\W\d]" also
+    # accepts numeric characters that aren't decimal digits or letters, so these are excluded explicitly.
+    return rf"(?!(?![{_numeric_not_decimal()}])[^\W\d])"
+
+
+def _numeric_not_decimal() -> str:
+    # The characters for which "str.isnumeric()" holds but "str.isdecimal()" and "str.isalpha()" don't (ie "²"), as the
+    # ranges of a regex character class, from the Unicode database of the running Python. Testing every code point in
+    # Python is slow, so they're all decoded into one string, in which the regex engine finds the runs of letters and
+    # these characters, and "str.isalpha()" rules out the parts of the runs that are only letters.
+    blocks = (sys.maxunicode + 1) >> 8
+    encoded = bytearray(4 * (sys.maxunicode + 1))
+    encoded[0::4] = bytes(range(256)) * blocks
+    encoded[1::4] = b"".join(bytes((block & 0xFF,)) * 256 for block in range(blocks))
+    encoded[2::4] = b"".join(bytes((block >> 8,)) * 256 for block in range(blocks))
+    encoded[4 * 0xD800:4 * 0xE000] = bytes(4 * 0x800)  # Surrogates can't be decoded, so are left as "\0".
+
+    found, pending = [], re.findall(r"[^\W\d_]+", encoded.decode("utf-32-le"))
+    while pending:
+        run = pending.pop()
+        if len(run) == 1 and not run.isalpha():
+            found.append(ord(run))
+        elif not run.isalpha():
+            pending += [run[:len(run) // 2], run[len(run) // 2:]]
+
+    ranges = []
+    for code in sorted(found):
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return "".join(re.escape(chr(low)) + (f"-{re.escape(chr(high))}" if high > low else "") for low, high in ranges)
+
+
+def _analyse_lexeme(lexeme: str) -> Tuple[bool, bool, Optional[FrozenSet[str]], bool]:
+    # Returns (embeddable, sliced, first characters, multi-line). Any failure of the private parser's analysis (ie an
+    # attribute it relies on having changed) falls back to the conservative analysis, and an invalid regex then raises
+    # re.error from compiling it, as it always did.
+    try:
+        return _parse_lexeme(lexeme)
+    except Exception:
+        return _compile_lexeme(lexeme)
+
+
+def _compile_lexeme(lexeme: str) -> Tuple[bool, bool, None, bool]:
+    # Analyse a lexeme without parsing it. Only a lexeme without groups (so without group references) or global flags is
+    # placed into a shared alternation, and one whose text could contain an anchor, word boundary or look-behind (any
+    # "^" but one negating a set, "\A", "\b", "\B" or "(?<") is matched against the remaining code. Its first characters
+    # are unbounded and it's assumed to read past newlines, so it's tried everywhere, as lex always did before.
+    compiled = re.compile(lexeme)
+    sliced = re.search(r"(?<!(?<!\\)\[)\^|\\[AbB]|\(\?<[=!]", lexeme) is not None
+    return compiled.groups == 0 and compiled.flags == re.UNICODE and not sliced, sliced, None, True
+
+
+def _parse_lexeme(lexeme: str) -> Tuple[bool, bool, Optional[FrozenSet[str]], bool]:
+    # A lexeme can only be placed into a shared alternation if it behaves identically there: group references, named
+    # groups and global flags don't survive being nested. Anchors, word boundaries and look-behinds see the text before
+    # the current position, which a sliced match never did, so those stay sliced. The first characters are the
+    # characters a match can start with, or None if that can't be bounded.
+    parsed = _parser.parse(lexeme)
+    embeddable = not parsed.state.groupdict and parsed.state.flags == re.UNICODE
+    sliced = False
+
+    def walk(node) -> None:
+        nonlocal embeddable, sliced
+        for item in node:
+            if isinstance(item, tuple) and len(item) == 2 and isinstance(item[0], _constants._NamedIntConstant):
+                op, av = item
+                if op in (_constants.GROUPREF, _constants.GROUPREF_EXISTS):
+                    embeddable = False
+                elif op == _constants.AT and av in _SLICED_ANCHORS:
+                    embeddable, sliced = False, True
+                elif op in (_constants.ASSERT, _constants.ASSERT_NOT) and av[0] < 0:
+                    embeddable, sliced = False, True
+                walk_value(av)
+            else:
+                walk_value(item)
+
+    def walk_value(value) -> None:
+        if isinstance(value, (list, tuple, _parser.SubPattern)):
+            walk(value)
+
+    walk(parsed)
+    multi_line = _reads_past_newline(parsed, bool(parsed.state.flags & re.DOTALL), True)
+    if parsed.state.flags & re.IGNORECASE:
+        return embeddable, sliced, None, multi_line
+    first, nullable = _first_chars(parsed)
+    return embeddable, sliced, None if first is None or nullable else frozenset(first), multi_line
+
+
+def _reads_past_newline(sequence, dotall: bool, leading: bool) -> bool:
+    # Whether an attempt to match a parsed regex sequence could read past the first newline after where it starts, ie
+    # whether anything other than a leading "\n" can match a newline (or "$" and "\Z", which test for the end of the
+    # text). If not, the attempt only depends on the text up to that newline. Unknown constructs are assumed to.
+    for index, (op, av) in enumerate(sequence):
+        match op:
+            case _constants.LITERAL:
+                reads = av == 10 and not (leading and index == 0)
+            case _constants.NOT_LITERAL:
+                reads = av != 10
+            case _constants.ANY:
+                reads = dotall
+            case _constants.IN:
+                reads = _set_matches_newline(av)
+            case _constants.AT:
+                reads = av in (_constants.AT_END, _constants.AT_END_STRING)
+            case _constants.SUBPATTERN:
+                reads = _reads_past_newline(av[3], (dotall or bool(av[1] & re.DOTALL)) and not av[2] & re.DOTALL, False)
+            case _constants.ATOMIC_GROUP:
+                reads = _reads_past_newline(av, dotall, False)
+            case _constants.BRANCH:
+                reads = any(_reads_past_newline(branch, dotall, False) for branch in av[1])
+            case _constants.MAX_REPEAT | _constants.MIN_REPEAT | _constants.POSSESSIVE_REPEAT:
+                reads = _reads_past_newline(av[2], dotall, False)
+            case _constants.ASSERT | _constants.ASSERT_NOT:
+                reads = _reads_past_newline(av[1], dotall, False)
+            case _:
+                reads = True
+        if reads:
+            return True
+    return False
+
+
+def _set_matches_newline(items) -> bool:
+    # Whether a parsed character set ("[...]", or a class like "\s") contains "\n".
+    newline_categories = {
+        _constants.CATEGORY_SPACE, _constants.CATEGORY_NOT_DIGIT, _constants.CATEGORY_NOT_WORD,
+        _constants.CATEGORY_LINEBREAK, _constants.CATEGORY_UNI_SPACE, _constants.CATEGORY_UNI_NOT_DIGIT,
+        _constants.CATEGORY_UNI_NOT_WORD, _constants.CATEGORY_UNI_LINEBREAK, _constants.CATEGORY_LOC_NOT_WORD}
+
+    negate, matches = False, False
+    for op, av in items:
+        match op:
+            case _constants.NEGATE:
+                negate = True
+            case _constants.LITERAL:
+                matches |= av == 10
+            case _constants.RANGE:
+                matches |= av[0] <= 10 <= av[1]
+            case _constants.CATEGORY:
+                matches |= av in newline_categories
+            case _:
+                return True
+    return matches != negate
+
+
+def _first_chars(sequence) -> Tuple[Optional[set], bool]:
+    # Returns (characters, nullable) for a parsed regex sequence. None means any character could start a match.
+    result = set()
+    for op, av in sequence:
+        match op:
+            case _constants.LITERAL:
+                first, nullable = {chr(av)}, False
+            case _constants.IN if all(o == _constants.LITERAL or o == _constants.RANGE and a[1] - a[0] < 256 for o, a in av):
+                first, nullable = set(), False
+                for o, a in av:
+                    first |= {chr(a)} if o == _constants.LITERAL else set(map(chr, range(a[0], a[1] + 1)))
+            case _constants.SUBPATTERN if not av[1] & re.IGNORECASE:
+                first, nullable = _first_chars(av[3])
+            case _constants.ATOMIC_GROUP:
+                first, nullable = _first_chars(av)
+            case _constants.BRANCH:
+                first, nullable = set(), False
+                for branch in av[1]:
+                    f, n = _first_chars(branch)
+                    if f is None:
+                        return None, False
+                    first, nullable = first | f, nullable or n
+            case _constants.MAX_REPEAT | _constants.MIN_REPEAT | _constants.POSSESSIVE_REPEAT:
+                first, nullable = _first_chars(av[2])
+                nullable = nullable or av[0] == 0
+            case _constants.AT | _constants.ASSERT | _constants.ASSERT_NOT:
+                first, nullable = set(), True
+            case _:
+                return None, False
+
+        if first is None:
+            return None, False
+        result |= first
+        if not nullable:
+            return result, False
+    return result, True
+
+
+class LexerTable:
+    """
+    LexerTable is the compiled form of a TokenType subclass, built once per token set by "LexerTable.of" and shared by
+    every Lexer using that token set. It holds the alternation segments the Lexer matches with, split by the first
+    character of the input at the current position, so only alternatives that could possibly match are tried.
+
+    Each segment is (pattern, token type, sliced). Shared alternations have no token type, as the named group that
+    matched identifies it; lexemes that can't be nested into an alternation are matched on their own, and sliced ones
+    against the remaining code. Tables are never mutated after construction, so they are safe to share between threads.
+
+    The table also numbers every token type (the SpecialTokens first, then the token set's members), which is how a
+    TokenStream stores token types compactly.
+
+    For re-lexing an edited source, "multi_line_starts" holds the characters at which an alternative that could read
+    past the next newline is tried (or is None if that could be any character). A match attempt starting elsewhere only
+    depends on the text up to the next newline.
+    """
+
+    __slots__ = [
+        "token_set", "types", "ordinals", "names", "dispatch", "default", "multi_line_starts", "single_line_comment",
+        "multi_line_comment", "newline", "whitespace"]
+
+    _tables: ClassVar[Dict[type[TokenType], LexerTable]] = {}
+    _lock: ClassVar[Lock] = Lock()
+
+    token_set: type[TokenType]
+    types: Tuple[TokenType | SpecialToken, ...]
+    ordinals: Mapping[TokenType | SpecialToken, int]
+    names: Mapping[str, TokenType]
+    dispatch: Mapping[str, Tuple[Segment, ...]]
+    default: Tuple[Segment, ...]
+    multi_line_starts: Optional[FrozenSet[str]]
+    single_line_comment: TokenType
+    multi_line_comment: TokenType
+    newline: TokenType
+    whitespace: TokenType
+
+    def __init__(self, token_set: type[TokenType]) -> None:
+        members = token_set._member_map_
+        tokens   = [t for t in members if t[:2] == "Tk"]
+        keywords = [t for t in members if t[:2] == "Kw"]
+        lexemes  = [t for t in members if t[:2] == "Lx"]
+
+        tokens.sort(key=lambda t: len(members[t].value), reverse=True)
+        keywords.sort(key=lambda t: len(members[t].value), reverse=True)
+
+        # Describe every alternative in priority order as (name, regex, embeddable, sliced, first characters, multi-line).
+        alternatives = []
+        for token in keywords + lexemes + tokens:
+            value = members[token].value
+            if token[:2] == "Kw":
+                alternatives.append((token, re.escape(value) + _keyword_boundary(), True, False, frozenset(value[:1]), "\n" in value[1:]))
+            elif token[:2] == "Tk":
+                alternatives.append((token, re.escape(value), True, False, frozenset(value[:1]), "\n" in value[1:]))
+            else:
+                alternatives.append((token, value, *_analyse_lexeme(value)))
+
+        # Map each possible first character to the segments of the alternatives that can start with it. Characters that
+        # start no known alternative use the default segments (alternatives whose first characters are unbounded).
+        compiled: Dict[Tuple[int, ...], Tuple[Segment, ...]] = {}
+        dispatch = {}
+        for char in sorted(set().union(*[a[4] for a in alternatives if a[4] is not None])):
+            selection = tuple(i for i, a in enumerate(alternatives) if a[4] is None or char in a[4])
+            if selection not in compiled:
+                compiled[selection] = self._segments(token_set, [alternatives[i] for i in selection])
+            dispatch[char] = compiled[selection]
+        self.default = self._segments(token_set, [a for a in alternatives if a[4] is None])
+
+        multi_line = [a[4] for a in alternatives if a[5]]
+        self.multi_line_starts = None if None in multi_line else frozenset().union(*multi_line)
+
+        self.token_set = token_set
+        self.types = tuple(dict.fromkeys([*SpecialToken, *members.values()]))
+        self.ordinals = MappingProxyType({token_type: i for i, token_type in enumerate(self.types)})
+        self.names = MappingProxyType({name: members[name] for name in keywords + lexemes + tokens})
+        self.dispatch = MappingProxyType(dispatch)
+        self.single_line_comment = token_set.single_line_comment_token()
+        self.multi_line_comment = token_set.multi_line_comment_token()
+        self.newline = token_set.newline_token()
+        self.whitespace = token_set.whitespace_token()
+
+    @staticmethod
+    def _segments(token_set: type[TokenType], alternatives: List[tuple]) -> Tuple[Segment, ...]:
+        # Group consecutive embeddable alternatives into one alternation, and give each other lexeme its own segment.
+        segments, pending = [], []
+        for name, regex, embeddable, sliced, _, _ in alternatives:
+            if embeddable:
+                pending.append(f"(?P<{name}>{regex})")
+                continue
+            if pending:
+                segments.append((re.compile("|".join(pending)), None, False))
+            segments.append((re.compile(regex), token_set._member_map_[name], sliced))
+            pending = []
+
+        if pending:
+            segments.append((re.compile("|".join(pending)), None, False))
+        return tuple(segments)
+
+    @classmethod
+    def of(cls, token_set: type[TokenType]) -> LexerTable:
+        # Compile the token set on first use only. The lock stops concurrent first uses compiling it more than once.
+        if (table := cls._tables.get(token_set)) is None:
+            with cls._lock:
+                if (table := cls._tables.get(token_set)) is None:
+                    table = cls._tables[token_set] = LexerTable(token_set)
+        return table
+
+
+__all__ = ["LexerTable"]
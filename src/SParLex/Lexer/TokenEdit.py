@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class TokenEdit:
+    """
+    TokenEdit describes how Lexer.relex changed a TokenStream: the tokens from "start" up to "old_end" were replaced by
+    the tokens from "start" up to "new_end". Tokens before "start" are unchanged, and the tokens from "old_end" onwards
+    are unchanged apart from moving along by "new_end - old_end" positions. Parser.reparse uses it to reuse the results
+    of rules that only looked at unchanged tokens.
+    """
+
+    start: int
+    old_end: int
+    new_end: int
+
+    @property
+    def delta(self) -> int:
+        return self.new_end - self.old_end
+
+
+__all__ = ["TokenEdit"]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+from typing import Iterator, List, Tuple, Type, overload
+
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.Tokens import SpecialToken, Token, TokenType
+
+
+class TokenStream(Sequence[Token]):
+    """
+    TokenStream is the compact output of the Lexer. Rather than a Token object per token, it stores the token types as
+    ordinals (see LexerTable.types) and the start/end offsets of each token into the lexed source, in parallel arrays.
+    Token objects are only created when they are asked for, and their text only when it's read, so a TokenStream can be
+    used anywhere a list of tokens is read (indexing, slicing, iteration, len), without copying the source.
+
+    Tokens the Lexer synthesises (the leading newline, the newlines of multi-line comments and the EOF token) have an
+    empty span, and their text is the text the Lexer would have given them.
+    """
+
+    __slots__ = ["source", "table", "kinds", "starts", "ends"]
+
+    source: str
+    table: LexerTable
+    kinds: array
+    starts: array
+    ends: array
+
+    def __init__(self, source: str, table: LexerTable) -> None:
+        offset_code = "I" if len(source) < 1 << 32 else "Q"
+        self.source = source
+        self.table = table
+        self.kinds = array("H")
+        self.starts = array(offset_code)
+        self.ends = array(offset_code)
+
+    def append(self, token_type: TokenType | SpecialToken, start: int, end: int) -> None:
+        self.kinds.append(self.table.ordinals[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def type(self, index: int) -> TokenType | SpecialToken:
+        return self.table.types[self.kinds[index]]
+
+    def text(self, index: int) -> str:
+        start, end = self.starts[index], self.ends[index]
+        if start != end:
+            return self.source[start:end]
+        return "<EOF>" if self.kinds[index] == self.table.ordinals[SpecialToken.EOF] else "\n"
+
+    def tokens(self) -> List[Token]:
+        # Materialise the whole stream as the list of tokens the Lexer used to return.
+        return [self[i] for i in range(len(self.kinds))]
+
+    @overload
+    def __getitem__(self, index: int) -> Token: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Token]: ...
+
+    def __getitem__(self, index: int | slice) -> Token | List[Token]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.kinds)))]
+        # The token refers back to the stream for its text and span (see Token).
+        kind = self.kinds[index]
+        return Token(None, self.table.types[kind], self, index if index >= 0 else index + len(self.kinds))
+
+    def __iter__(self) -> Iterator[Token]:
+        return (self[i] for i in range(len(self.kinds)))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __reduce__(self) -> Tuple:
+        # Pickle the arrays and the token set, rather than the LexerTable, which is looked up again when unpickled.
+        return _token_stream, (self.source, self.table.token_set, self.kinds, self.starts, self.ends)
+
+
+def _token_stream(source: str, token_set: Type[TokenType], kinds: array, starts: array, ends: array) -> TokenStream:
+    tokens = TokenStream(source, LexerTable.of(token_set))
+    tokens.kinds, tokens.starts, tokens.ends = kinds, starts, ends
+    return tokens
+
+
+__all__ = ["TokenStream"]
@@ -1,7 +1,10 @@
 from __future__ import annotations
 from abc import abstractmethod
-from dataclasses import dataclass
 from fastenum import Enum
+from typing import Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from SParLex.Lexer.TokenStream import TokenStream
 
 
 class SpecialToken(Enum):
@@ -62,19 +65,67 @@ class TokenType(Enum):
         return self.value
 
 
-@dataclass
 class Token[T: Enum]:
     """
-    Token is a dataclass that represents a token generated by the lexer. It contains the metadata of the token and the
-    type of the token. The metadata is the actual text that the token represents. For regex based tokens, the metadata
-    will be the actual match of the regex.
+    Token represents a token generated by the lexer. It contains the metadata of the token and the type of the token.
+    The metadata is the actual text that the token represents. For regex based tokens, the metadata will be the actual
+    match of the regex.
+
+    A token read from a TokenStream also has its span: "source" is the text it was lexed from, and "start" and "end" are
+    its offsets into it. Such a token only refers to its position in the stream, and its metadata is sliced from the
+    source when it's read, so reading tokens (as the Parser does) doesn't copy their text. A token created from its text
+    has no source, and offsets of -1.
 
-    There is no need to override this class, as it is a simple dataclass that holds the token metadata and the token
-    type.
+    There is no need to override this class, as it is a simple class that holds the token metadata and the token type.
     """
 
-    token_metadata: str
+    __slots__ = ["token_type", "_text", "_index"]
+
     token_type: T
+    _text: str | TokenStream
+    _index: int
+
+    def __init__(self, token_metadata: Optional[str], token_type: T, stream: Optional[TokenStream] = None, index: int = -1) -> None:
+        # The text is either the token's own metadata, or the TokenStream it's at (non-negative) "index" in.
+        self.token_type = token_type
+        self._text = token_metadata if stream is None else stream
+        self._index = index if stream is not None else -1
+
+    @property
+    def token_metadata(self) -> str:
+        return self._text if self._index < 0 else self._text.text(self._index)
+
+    @token_metadata.setter
+    def token_metadata(self, token_metadata: str) -> None:
+        # The token no longer matches its span, so it loses it.
+        self._text, self._index = token_metadata, -1
+
+    @property
+    def source(self) -> Optional[str]:
+        return self._text.source if self._index >= 0 else None
+
+    @property
+    def start(self) -> int:
+        return self._text.starts[self._index] if self._index >= 0 else -1
+
+    @property
+    def end(self) -> int:
+        return self._text.ends[self._index] if self._index >= 0 else -1
+
+    def __eq__(self, other: object) -> bool:
+        # Tokens are equal by their type and metadata, as before they had spans, wherever they were lexed from.
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.token_type == other.token_type and self.token_metadata == other.token_metadata
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Token(token_metadata={self.token_metadata!r}, token_type={self.token_type!r})"
+
+    def __reduce__(self) -> Tuple:
+        # Pickle the metadata rather than the whole stream (so without the span).
+        return Token, (self.token_metadata, self.token_type)
 
     def __str__(self):
         return self.token_metadata
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Type
+
+from SParLex.Lexer.Lexer import Lexer
+from SParLex.Lexer.Tokens import TokenType
+from SParLex.Parser.Parser import Parser
+from SParLex.Parser.ParserError import ParserError
+from SParLex.Parser.ParseResult import ParseResult
+from SParLex.Utils.ParseCache import ParseCache
+
+
+def parse_files(
+        paths: Iterable[str | os.PathLike], token_set: Type[TokenType], parser_class: Type[Parser],
+        workers: Optional[int] = None, *, encoding: str = "utf-8", cache: Optional[ParseCache] = None,
+        **parser_kwargs: Any) -> Iterator[ParseResult]:
+    """
+    Lex and parse many files over a pool of worker processes, yielding a ParseResult per file, in the order the files
+    finish rather than the order they were given. Each worker reads, lexes and parses its file itself, so only the path
+    is sent to it and only the AST (or the formatted error) is sent back, never the source or the tokens.
+
+    The token set and parser class must be importable by the workers (defined at a module's top level), and the keyword
+    arguments are passed to the parser class' constructor. With "workers" set to 1 the files are parsed in this process,
+    and by default there is a worker per CPU. Only a few files per worker are queued at once, so the paths can be a lazy
+    iterable, and stopping the iteration early cancels the files not yet started. Given a ParseCache, the workers share
+    it, so only files that have changed since they were cached are lexed and parsed.
+
+    Example:
+        - for result in parse_files(glob("src/**/*.spp"), MyTokenType, MyParser, workers=8): ...
+    """
+
+    paths = iter(paths)
+    if workers == 1:
+        for path in paths:
+            yield _parse_file(path, token_set, parser_class, parser_kwargs, encoding, cache)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers)
+    try:
+        def submit(path: str | os.PathLike) -> Future[ParseResult]:
+            return executor.submit(_parse_file, path, token_set, parser_class, parser_kwargs, encoding, cache)
+
+        # Keep each worker busy with a few queued files, submitting another file as each one finishes.
+        pending: Set[Future[ParseResult]] = {submit(path) for path in islice(paths, workers * 4)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.update(submit(path) for path in islice(paths, 1))
+                yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _parse_file(
+        path: str | os.PathLike, token_set: Type[TokenType], parser_class: Type[Parser], parser_kwargs: Dict[str, Any],
+        encoding: str, cache: Optional[ParseCache]) -> ParseResult:
+    # Runs in a worker. Reading and parsing errors (and any other exception lexing or parsing raises) are returned in the
+    # result, so one bad file doesn't end the batch. The cache needs the whole source to hash, so it's read up front.
+    path = os.fspath(path)
+    try:
+        with open(path, encoding=encoding) as file:
+            source = file.read() if cache is not None else Lexer(file, token_set).lex()
+    except (OSError, UnicodeDecodeError) as e:
+        return ParseResult(path, error=ParserError(f"Could not read '{path}': {e}"))
+    except ParserError as e:
+        return ParseResult(path, error=e)
+    except Exception as e:
+        return ParseResult(path, error=_unexpected_error("lex", path, e))
+
+    try:
+        if cache is not None:
+            ast, errors = cache.parse_with_errors(source, token_set, parser_class, path, **parser_kwargs)
+            return ParseResult(path, ast=ast, errors=errors)
+        parser = parser_class(token_set, source, path, **parser_kwargs)
+        ast = parser.parse()
+        return ParseResult(path, ast=ast, errors=parser.format_errors())
+    except ParserError as e:
+        return ParseResult(path, error=e)
+    except Exception as e:
+        return ParseResult(path, error=_unexpected_error("parse", path, e))
+
+
+def _unexpected_error(action: str, path: str, error: Exception) -> ParserError:
+    # Any other exception (ie a RecursionError on a deeply nested file, or a bug in a rule) is described by a ParserError
+    # too, as the exception itself might not survive being sent back from a worker.
+    return ParserError(f"Could not {action} '{path}': {type(error).__name__}: {error}")
+
+
+__all__ = ["parse_files"]
@@ -0,0 +1,52 @@
+from __future__ import annotations
+from typing import Callable, Final, Optional, Tuple, TYPE_CHECKING
+
+from SParLex.Ast.Ast import Ast
+from SParLex.Parser.ParserFailure import FAILURE
+from SParLex.Parser.ParserRuleHandler import ParserRuleHandler
+
+if TYPE_CHECKING:
+    from SParLex.Parser.Parser import Parser
+
+
+class CooperativeRuleHandler[T](ParserRuleHandler[T]):
+    """
+    CooperativeRuleHandler is the ParserRuleHandler a Parser creates while it parses in Parser.aparse, which counts the
+    rules parsed, pausing the parse every so many of them so the event loop can run. The rest of "_rule" is repeated
+    here rather than called, as the extra call on every rule would slow the parse down by a third. A profiled Parser's
+    handler is wrapped instead, so the parse is still profiled.
+    """
+
+    __slots__ = ["_handler"]
+
+    _handler: Final[Optional[ParserRuleHandler[T]]]
+
+    def __init__(self, parser: Parser, func: Callable[..., T], args: Tuple, memoize: bool, key: Optional[Tuple[Callable, Tuple]], recover: bool, handler: Optional[ParserRuleHandler[T]] = None) -> None:
+        super().__init__(parser, func, args, memoize, key, recover)
+        self._handler = handler
+
+    def _rule(self) -> T | FAILURE:
+        parser = self._parser
+        parser._ticks -= 1
+        if parser._ticks <= 0:
+            parser._pause()
+
+        if self._handler is not None:
+            return self._handler._rule()
+        if self._key is not None:
+            result = parser._parse_predicted(self._func, self._args, self._memoize)
+        elif self._memoize:
+            result = parser._parse_memoized(self._func, self._args)
+        else:
+            result = self._func(parser, *self._args)
+        if result is not FAILURE and isinstance(result, Ast) and getattr(result, "_end", -1) < 0:
+            result._end = parser._index
+        return result
+
+    def predicts_failure(self) -> bool:
+        if self._handler is not None:
+            return self._handler.predicts_failure()
+        return self._key is not None and self._parser._predicts_failure(self._key)
+
+
+__all__ = ["CooperativeRuleHandler"]
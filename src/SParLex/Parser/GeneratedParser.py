@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import Any, Callable, ClassVar, List, Optional, Tuple
+
+from SParLex.Ast import *
+from SParLex.Lexer.TokenEdit import TokenEdit
+from SParLex.Lexer.Tokens import SpecialToken, Token, TokenType
+from SParLex.Lexer.TokenStream import TokenStream
+from SParLex.Parser.Parser import Parser
+from SParLex.Parser.ParserError import ParserErrors
+from SParLex.Parser.ParserFailure import FAILURE, ParserFailure
+
+
+type Item = Tuple[Callable[..., Any], Tuple]
+
+
+class GeneratedParser(Parser):
+    """
+    GeneratedParser is the base of the parser classes that ParserGenerator emits, which subclass both it and the Parser
+    they were generated from. The generated "_g_" methods parse without ParserRuleHandlers and without recording errors,
+    using the helpers here for the constructs that weren't inlined. If that parse fails, the tokens are parsed again by
+    the original rules, so a failed parse raises exactly the ParserError the original Parser would have.
+    """
+
+    # The generated rule methods, with their packrat setting, and the ordinal of the EOF token.
+    _g_rules: ClassVar[Tuple[Tuple[str, Optional[bool]], ...]] = ()
+    _g_eof: ClassVar[int] = 0
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        # Memoize the generated rules that the original rules would have memoized, through the same packrat memo.
+        for name, packrat in self._g_rules:
+            if packrat or packrat is None and self._packrat:
+                setattr(self, name, partial(self._g_memoized, getattr(type(self), name)))
+
+    def parse(self) -> RootAst:
+        self._errors = []
+        if (ast := self._g_parse()) is not FAILURE:
+            return ast
+
+        # Parse again with the original rules, for the error (or to recover from it).
+        self._index, self._examined, self._error = 0, -1, ParserErrors.SyntaxError()
+        self._memo.clear()
+        return super().parse()
+
+    def reparse(self, tokens: TokenStream, edit: TokenEdit) -> RootAst:
+        # The generated rules don't record which tokens they examined, so no memo entry can be reused.
+        self._memo.clear()
+        return super().reparse(tokens, edit)
+
+    def _g_parse(self) -> RootAst | FAILURE:
+        # The generated parse, returning FAILURE rather than raising a ParserError.
+        try:
+            c0 = self._index
+            p1 = self._g_parse_root()
+            if p1 is FAILURE or (p2 := self._g_token(self._g_eof, SpecialToken.EOF)) is FAILURE:
+                return FAILURE
+            return RootAst(c0, p1, p2)
+        except ParserFailure:
+            return FAILURE
+
+    def _g_parse_root(self) -> Ast | FAILURE:
+        return self.parse_root().try_parse()
+
+    def _g_memoized(self, func: Callable[..., Any], *args) -> Any:
+        return self._parse_memoized(func, args)
+
+    def _g_token(self, ordinal: int, token_type: TokenType | SpecialToken) -> TokAst | FAILURE:
+        # As parse_token, with the ordinal of the token type given, and without recording an error.
+        if token_type is SpecialToken.NO_TOK:
+            return TokAst(self._index, Token("", SpecialToken.NO_TOK))
+        if self._index >= self._token_len:
+            return FAILURE
+
+        if token_type is not self._newline_token:
+            self._index = index = self._index + self._next_significant[self._index]
+        else:
+            self._index = index = self._index + self._next_non_whitespace[self._index]
+        if self._kinds[index] != ordinal:
+            return FAILURE
+        self._index = index + 1
+        return TokAst(index, self._tokens[index])
+
+    def _g_once(self, value: Any) -> Any:
+        if value is FAILURE:
+            raise self._failure.with_traceback(None)
+        return value
+
+    def _g_optional(self, func: Callable[..., Any], args: Tuple) -> Any:
+        index = self._index
+        if (value := func(*args)) is FAILURE:
+            self._index = index
+            return None
+        return value
+
+    def _g_first_of(self, items: Tuple[Item, ...]) -> Any:
+        # An alternation's "try_parse", without prediction.
+        for func, args in items:
+            index = self._index
+            if (value := func(*args)) is not FAILURE:
+                return value
+            self._index = index
+        return FAILURE
+
+    def _g_optional_of(self, items: Tuple[Item, ...]) -> Any:
+        # An alternation's "parse_optional", without prediction.
+        for func, args in items:
+            index = self._index
+            if (value := self._g_optional(func, args)) is not None:
+                return value
+            self._index = index
+        return None
+
+    def _g_zero_or_more(self, func: Callable[..., Any], args: Tuple, separator: Optional[Item]) -> List[Any]:
+        # As ParserRuleHandler.parse_zero_or_more, where "separator" is None for SpecialToken.NO_TOK.
+        result = []
+        while True:
+            if result and separator is not None and separator[0](*separator[1]) is FAILURE:
+                break
+            if (value := func(*args)) is FAILURE:
+                if result and separator is not None:
+                    self._index -= 1
+                break
+            result.append(value)
+        return result
+
+    def _g_at_least(self, count: int, func: Callable[..., Any], args: Tuple, separator: Optional[Item]) -> List[Any]:
+        result = self._g_zero_or_more(func, args, separator)
+        if len(result) < count:
+            raise self._failure.with_traceback(None)
+        return result
+
+
+__all__ = ["GeneratedParser"]
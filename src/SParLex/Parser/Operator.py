@@ -0,0 +1,50 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Optional, TYPE_CHECKING
+
+from SParLex.Ast import Ast, BinaryAst, PostfixAst, PrefixAst
+from SParLex.Lexer.Tokens import TokenType
+
+if TYPE_CHECKING:
+    from SParLex.Parser.Parser import Parser
+    from SParLex.Parser.ParserRuleHandler import ParserRuleHandler
+
+
+@dataclass(slots=True, frozen=True)
+class Operator:
+    """
+    Operator declares a token type as a prefix, infix or postfix operator for Parser.parse_operators, with a precedence
+    (higher binds more tightly) and, for infix operators, whether it's right-associative. The "build" function creates
+    the operator's Ast, called with the same arguments as the default node class: (pos, lhs, op, rhs) for BinaryAst,
+    (pos, op, rhs) for PrefixAst and (pos, lhs, op, suffix) for PostfixAst. A postfix operator can also have a rule,
+    called with the Parser to get a ParserRuleHandler, which is parsed after the operator's token to give the suffix
+    (ie the arguments and ")" of a call after the "(").
+
+    Examples:
+        - Operator.infix(MyTokenType.TkPlus, 10)
+        - Operator.infix(MyTokenType.TkStarStar, 30, right=True)
+        - Operator.prefix(MyTokenType.TkMinus, 20)
+        - Operator.postfix(MyTokenType.TkLParen, 40, rule=MyParser.parse_call_tail, build=CallAst)
+    """
+
+    token_type: TokenType
+    precedence: int
+    fixity: Literal["prefix", "infix", "postfix"]
+    right: bool
+    build: Callable[..., Ast]
+    rule: Optional[Callable[[Parser], ParserRuleHandler]] = None
+
+    @staticmethod
+    def infix(token_type: TokenType, precedence: int, *, right: bool = False, build: Callable[[int, Ast, Any, Ast], Ast] = BinaryAst) -> Operator:
+        return Operator(token_type, precedence, "infix", right, build)
+
+    @staticmethod
+    def prefix(token_type: TokenType, precedence: int, *, build: Callable[[int, Any, Ast], Ast] = PrefixAst) -> Operator:
+        return Operator(token_type, precedence, "prefix", False, build)
+
+    @staticmethod
+    def postfix(token_type: TokenType, precedence: int, *, rule: Optional[Callable[[Parser], ParserRuleHandler]] = None, build: Callable[[int, Ast, Any, Any], Ast] = PostfixAst) -> Operator:
+        return Operator(token_type, precedence, "postfix", False, build, rule)
+
+
+__all__ = ["Operator"]
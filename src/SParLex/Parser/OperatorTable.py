@@ -0,0 +1,50 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Tuple
+
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.Tokens import TokenType
+from SParLex.Parser.Operator import Operator
+
+
+class OperatorTable:
+    """
+    OperatorTable is the set of Operators that Parser.parse_operators parses expressions with. A token type can be both
+    a prefix operator and an infix or postfix operator (ie "-"), but only one of each. Operators skip newlines like any
+    other token, so the newline token can't be one. Tables are immutable, so they're best built once, at module level,
+    and shared by every Parser.
+
+    Example:
+        - OPERATORS = OperatorTable([Operator.infix(MyTokenType.TkPlus, 10), Operator.prefix(MyTokenType.TkMinus, 20)])
+    """
+
+    __slots__ = ["operators", "_compiled"]
+
+    operators: Tuple[Operator, ...]
+    _compiled: Dict[LexerTable, Tuple[Dict[int, Operator], Dict[int, Operator], Tuple[TokenType, ...]]]
+
+    def __init__(self, operators: Iterable[Operator]) -> None:
+        self.operators = tuple(operators)
+        self._compiled = {}
+
+        seen = set()
+        for operator in self.operators:
+            position = (operator.token_type, operator.fixity == "prefix")
+            if position in seen:
+                raise ValueError(f"'{operator.token_type.name}' is declared as more than one {'prefix' if position[1] else 'infix or postfix'} operator.")
+            if operator.token_type is operator.token_type.newline_token():
+                raise ValueError(f"The newline token '{operator.token_type.name}' can't be an operator.")
+            seen.add(position)
+
+    def compiled(self, table: LexerTable) -> Tuple[Dict[int, Operator], Dict[int, Operator], Tuple[TokenType, ...]]:
+        # The prefix operators, and the infix and postfix operators, keyed by token ordinal for the token set, with the
+        # token types of the latter (which are what's expected after an operand). These are tightest-binding first, the
+        # order a rule per precedence level would have tried them in.
+        if (compiled := self._compiled.get(table)) is None:
+            prefixes = {table.ordinals[o.token_type]: o for o in self.operators if o.fixity == "prefix"}
+            suffixes = {table.ordinals[o.token_type]: o for o in self.operators if o.fixity != "prefix"}
+            expected = tuple(o.token_type for o in sorted(suffixes.values(), key=lambda o: -o.precedence))
+            compiled = self._compiled[table] = (prefixes, suffixes, expected)
+        return compiled
+
+
+__all__ = ["OperatorTable"]
@@ -0,0 +1,32 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from SParLex.Ast import RootAst
+from SParLex.Parser.ParserError import ParserError
+
+
+@dataclass(slots=True)
+class ParseResult:
+    """
+    ParseResult is the outcome of parsing one file with parse_files. Exactly one of the AST and the error is set: the
+    error is the ParserError the Parser raised, its message already formatted by the ErrorFormatter (or, if the file
+    couldn't be read or the parse raised another exception, a ParserError describing why), so a failed file doesn't stop
+    the rest of the batch.
+
+    A recovering Parser (see Parser) returns an AST even when the file has syntax errors, so the errors it recovered
+    from are kept in "errors", formatted as "error" would be. They're empty for a file that parsed without errors.
+
+    Example:
+        - for result in parse_files(paths, MyTokenType, MyParser):
+              if result.error: print(result.error)
+              for error in result.errors: print(error)
+    """
+
+    path: str
+    ast: Optional[RootAst] = None
+    error: Optional[ParserError] = None
+    errors: List[ParserError] = field(default_factory=list)
+
+
+__all__ = ["ParseResult"]
@@ -1,48 +1,175 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Callable, List, Optional, Type, TYPE_CHECKING
+from array import array
+from collections import OrderedDict
+import copy
+import dataclasses
+import threading
+from typing import Any, Callable, ClassVar, Dict, FrozenSet, List, Optional, Sequence, Tuple, Type, TYPE_CHECKING
 
 from SParLex.Ast import *
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.TokenEdit import TokenEdit
 from SParLex.Lexer.Tokens import Token, TokenType, SpecialToken
+from SParLex.Lexer.TokenStream import TokenStream
+from SParLex.Parser.CooperativeRuleHandler import CooperativeRuleHandler
+from SParLex.Parser.ParserAlternateRulesHandler import ParserAlternateRulesHandler
+from SParLex.Parser.ParserError import ParserError, ParserErrors
+from SParLex.Parser.ParserFailure import FAILURE, ParserFailure
 from SParLex.Parser.ParserRuleHandler import ParserRuleHandler
+from SParLex.Parser.ProfiledAlternateRulesHandler import ProfiledAlternateRulesHandler
+from SParLex.Parser.ProfiledRuleHandler import ProfiledRuleHandler
+from SParLex.Utils.ErrorFormatter import ErrorFormatter
+from SParLex.Utils.LineIndex import LineIndex
 
+# Only needed for annotations, and slow to import (asyncio itself is imported by aparse, the only method that uses it).
 if TYPE_CHECKING:
-    from SParLex.Parser.ParserError import ParserError, ParserErrors
-    from SParLex.Utils.ErrorFormatter import ErrorFormatter
+    from concurrent.futures import Executor
+    from SParLex.Parser.Operator import Operator
+    from SParLex.Parser.OperatorTable import OperatorTable
+    from SParLex.Utils.Profiler import Profiler
 
 
-# Decorator that wraps the function in a ParserRuleHandler
-def parser_rule[T](func: Callable[..., T]) -> Callable[..., ParserRuleHandler]:
-    def wrapper(self, *args) -> ParserRuleHandler[T]:
-        return ParserRuleHandler(self, lambda: func(self, *args))
-    return wrapper
+# Decorator that wraps the function in a ParserRuleHandler. Used bare (@parser_rule), or as @parser_rule(packrat=...) to
+# always (True) or never (False) memoize the rule, regardless of whether the Parser has packrat parsing enabled. The
+# "predict" argument does the same for FIRST-set prediction, and "recover" makes a repetition of the rule a place where a
+# recovering Parser recovers from syntax errors (see Parser._parse_recovering). Handlers are stateless, so each Parser
+# reuses one handler per rule and arguments, rather than creating one per call.
+def parser_rule[T](func: Optional[Callable[..., T]] = None, *, packrat: Optional[bool] = None, predict: Optional[bool] = None, recover: bool = False) -> Callable[..., ParserRuleHandler]:
+    def decorator(func: Callable[..., T]) -> Callable[..., ParserRuleHandler]:
+        def wrapper(self, *args) -> ParserRuleHandler[T]:
+            key = (func, args)
+            try:
+                handler = self._handlers.get(key)
+            except TypeError:
+                return self._new_handler(func, args, key, packrat, predict, recover)
+            if handler is None:
+                handler = self._new_handler(func, args, key, packrat, predict, recover)
+                if len(self._handlers) < self._handlers_size:
+                    self._handlers[key] = handler
+            return handler
+
+        # Keep the rule and its settings reachable, for ParserGenerator.
+        wrapper.__wrapped__ = func
+        wrapper.parser_rule_options = (packrat, predict, recover)
+        return wrapper
+    return decorator(func) if func else decorator
 
 
 class Parser(ABC):
-    _tokens: List[Token]
+    _first_sets: ClassVar[Dict[Tuple[type, Type[TokenType]], Dict]] = {}
+
+    _tokens: List[Token] | TokenStream
     _token_len: int
     _token_set: Type[TokenType]
+    _table: LexerTable
+    _kinds: Sequence[int]
+    _next_significant: Sequence[int]
+    _next_non_whitespace: Sequence[int]
     _name: str
     _index: int
+    _examined: int
     _err_fmt: ErrorFormatter
     _error: Optional[ParserErrors.SyntaxError]
+    _failure: ParserFailure
     _newline_token: SpecialToken
     _whitespace_token: SpecialToken
+    _newline_kind: int
+    _whitespace_kind: int
+    _packrat: bool
+    _memo: OrderedDict[Tuple[Callable, Tuple, int], Tuple[Any, int, Tuple[Optional[int], Tuple, Tuple[TokenType, ...]], int, int, List[Token] | TokenStream]]
+    _memo_size: int
+    _memo_reach: array
+    _token_ids: array
+    _next_token_id: int
+    _predict: bool
+    _first_set_exclusions: Dict[Tuple[Callable, Tuple], Dict[int, Tuple[Tuple, Tuple[TokenType, ...], Optional[bool]]]]
+    _handlers: Dict[Tuple[Callable, Tuple], ParserRuleHandler]
+    _handlers_size: int
+    _profiler: Optional[Profiler]
+    _alternation_class: Type[ParserAlternateRulesHandler]
+    _recover: bool
+    _recovering: bool
+    _sync_kinds: FrozenSet[int]
+    _errors: List[ParserErrors.SyntaxError]
+    _options: Dict[str, Any]
+    _pause: Optional[Callable[[], None]]
+    _ticks: int
 
-    def __init__(self, token_set: Type[TokenType], tokens: List[Token], file_name: str = "", error_formatter: Optional[ErrorFormatter] = None) -> None:
-        from SParLex.Parser.ParserError import ParserErrors
-        from SParLex.Utils.ErrorFormatter import ErrorFormatter
+    def __init__(
+            self, token_set: Type[TokenType], tokens: List[Token] | TokenStream, file_name: str = "",
+            error_formatter: Optional[ErrorFormatter] = None, packrat: bool = False, packrat_size: int = 1 << 16,
+            predict: bool = False, profiler: Optional[Profiler] = None, recover: bool = False,
+            sync_tokens: Optional[Sequence[TokenType | SpecialToken]] = None) -> None:
+        # Token types are compared as ordinals, which a TokenStream already stores, and a list of tokens is converted to.
+        self._table = LexerTable.of(token_set)
+        self._kinds = tokens.kinds if isinstance(tokens, TokenStream) else array("H", [self._table.ordinals[t.token_type] for t in tokens])
 
         self._tokens = tokens
         self._token_len = len(tokens)
         self._token_set = token_set
         self._name = file_name
         self._index = 0
+        self._examined = -1
         self._err_fmt = error_formatter or ErrorFormatter(token_set, self._tokens, file_name)
         self._error = ParserErrors.SyntaxError()
+        self._failure = ParserFailure()
         self._newline_token = token_set.newline_token()
         self._whitespace_token = token_set.whitespace_token()
+        self._newline_kind = self._table.ordinals[self._newline_token]
+        self._whitespace_kind = self._table.ordinals[self._whitespace_token]
+        self._packrat = packrat
+        self._memo = OrderedDict()
+        self._memo_size = packrat_size
+        self._memo_reach = array("q", [-1]) * (self._token_len + 1)
+        self._token_ids = array("Q", range(self._token_len + 1))
+        self._next_token_id = self._token_len + 1
+        self._predict = predict
+        self._first_set_exclusions = Parser._first_sets_for(type(self), token_set)
+        self._handlers = {}
+        self._handlers_size = 1 << 12
+        self._profiler = profiler
+        self._alternation_class = ParserAlternateRulesHandler if profiler is None else ProfiledAlternateRulesHandler
+        self._recover = recover
+        self._recovering = False
+        self._sync_kinds = frozenset(self._table.ordinals[t] for t in sync_tokens or (self._newline_token,))
+        self._errors = []
+        self._options = {"packrat": packrat, "packrat_size": packrat_size, "predict": predict, "recover": recover, "sync_tokens": sync_tokens}
+        self._pause = None
+        self._ticks = 0
+        self._next_significant, self._next_non_whitespace = self._trivia_distances(0, len(self._kinds), len(self._kinds), len(self._kinds))
+
+    def _trivia_distances(self, begin: int, end: int, significant: int, non_whitespace: int) -> Tuple[array, array]:
+        # For each position from "begin" up to "end", precompute the distance to the next token that isn't a newline or
+        # whitespace, and to the next token that isn't whitespace, so parse_token can skip trivia with a lookup rather
+        # than re-scanning it on every attempt. "significant" and "non_whitespace" are the next such tokens from "end".
+        # Distances rather than positions are stored, so they stay valid as tokens before them are inserted or removed.
+        kinds = self._kinds
+        offset_code = "I" if len(kinds) < 1 << 32 else "Q"
+        next_significant = array(offset_code, [0]) * (end - begin)
+        next_non_whitespace = array(offset_code, [0]) * (end - begin)
+
+        for i in range(end - 1, begin - 1, -1):
+            if kinds[i] != self._whitespace_kind:
+                non_whitespace = i
+                if kinds[i] != self._newline_kind:
+                    significant = i
+            next_significant[i - begin] = significant - i
+            next_non_whitespace[i - begin] = non_whitespace - i
+        return next_significant, next_non_whitespace
+
+    def _new_handler[T](self, func: Callable[..., T], args: Tuple, key: Tuple[Callable, Tuple], packrat: Optional[bool], predict: Optional[bool], recover: bool) -> ParserRuleHandler[T]:
+        # Resolve the rule's packrat and prediction settings against the Parser's own. Only a profiled Parser creates
+        # instrumented handlers, and only aparse creates pausing ones, so neither costs anything otherwise.
+        memoize = packrat or packrat is None and self._packrat
+        key = key if predict or predict is None and self._predict else None
+        if self._profiler is not None:
+            handler = ProfiledRuleHandler(self, func, args, memoize, key, self._profiler, recover)
+            return handler if self._pause is None else CooperativeRuleHandler(self, func, args, memoize, key, recover, handler)
+        if self._pause is not None:
+            return CooperativeRuleHandler(self, func, args, memoize, key, recover)
+        return ParserRuleHandler(self, func, args, memoize, key, recover)
 
     def current_pos(self) -> int:
         return self._index
@@ -50,67 +177,552 @@ class Parser(ABC):
     def current_tok(self) -> Token:
         return self._tokens[self._index]
 
+    def errors(self) -> List[ParserErrors.SyntaxError]:
+        # The syntax errors a recovering Parser's last parse recovered from, in the order of their positions. Empty after
+        # a parse that succeeded without recovering.
+        return self._errors
+
+    def format_errors(self) -> List[ParserError]:
+        # The errors, formatted as the ParserError that parsing without recovery raises for the first of them.
+        return [error.format(self._err_fmt) for error in self._errors]
+
+    def line_index(self) -> LineIndex:
+        # The line index of the tokens being parsed, shared with the error formatter (so errors raised by this parser reuse
+        # it), for mapping token positions to lines and columns.
+        return self._err_fmt.line_index
+
+    def span(self, ast: Ast) -> Tuple[int, int]:
+        # The offsets into the source of the start of an Ast's first token and the end of its last, in constant time for
+        # an Ast a rule returned (see Ast.end_pos). For a list of tokens, the offsets are into the tokens' text, joined.
+        first, end = self._token_range(ast)
+        if first < 0:
+            return -1, -1
+        if isinstance(self._tokens, TokenStream):
+            start = self._tokens.starts[first] if first < self._token_len else len(self._tokens.source)
+            return start, self._tokens.ends[end - 1] if end > first else start
+        line_index = self.line_index()
+        return line_index.offset(first), line_index.offset(end)
+
+    def text(self, ast: Ast) -> str:
+        # The source text of an Ast, from its first token to its last, sliced from the source of a TokenStream.
+        if isinstance(self._tokens, TokenStream):
+            start, end = self.span(ast)
+            return self._tokens.source[start:end] if start >= 0 else ""
+        first, end = self._token_range(ast)
+        return "".join(str(token) for token in self._tokens[first:end]) if first >= 0 else ""
+
+    def _token_range(self, ast: Ast) -> Tuple[int, int]:
+        # The positions of an Ast's first token and after its last. An Ast's position is where the Parser was when its
+        # rule started, so the whitespace and newlines before its first token are skipped.
+        first, end = ast.pos, max(ast.end_pos, ast.pos)
+        if not isinstance(ast, TokAst) and first < end:
+            first = min(first + self._next_significant[first], end)
+        return first, end
+
     # ===== PARSING =====
 
     def parse(self) -> RootAst:
-        from SParLex.Parser.ParserError import ParserError
-
+        # Failures are recorded in the SyntaxError as the parse goes, which is only formatted and raised once it has failed,
+        # unless the Parser recovers from errors, when the tokens are parsed again, recovering (see _parse_recovering).
+        self._errors = []
         try:
             c0 = self.current_pos()
             p1 = self.parse_root().parse_once()
             p2 = self.parse_eof().parse_once()
             return RootAst(c0, p1, p2)
 
-        except ParserError as e:
-            e.throw(self._err_fmt)
+        except ParserFailure:
+            if not self._recover:
+                self._error.throw(self._err_fmt)
+        return self._parse_recovering()
+
+    async def aparse(self, yield_every: int = 250, executor: Optional[Executor] = None) -> RootAst:
+        """
+        Parse as parse does, without blocking an asyncio event loop. The parse runs on a thread of its own, but never
+        alongside the loop: the loop waits while it parses "yield_every" rules, and it waits while the loop runs the
+        other ready tasks, so the loop's other tasks are delayed by one slice of the parse at most, rather than all of
+        it, and the two don't contend for the GIL. Cancelling the task stops the parse there and resets the Parser. Only
+        rules parsed through ParserRuleHandlers are counted, so a GeneratedParser's own rules don't pause.
+
+        Given an executor, the tokens are parsed there instead, by a new Parser of the same class and options (without
+        the Profiler); a process pool is sent the tokens as their compact arrays, and sends back the AST (or ParserError),
+        and the errors of a recovering parse. Cancelling then stops waiting for it, but a parse already running finishes.
+
+        Example:
+            - ast = await parser.aparse(yield_every=500)
+        """
+
+        import asyncio
+
+        if executor is not None:
+            ast, self._errors = await asyncio.get_running_loop().run_in_executor(
+                executor, _parse, type(self), self._token_set, self._tokens, self._name, self._options)
+            return ast
+
+        # The thread and the loop hand control to each other with a pair of semaphores. The thread raises _ParseCancelled
+        # from the pause it's in, once the task is cancelled, which unwinds the parse.
+        resumed, paused = threading.Semaphore(0), threading.Semaphore(0)
+        outcome: List[Any] = []
+        cancelled = False
+
+        def pause() -> None:
+            self._ticks = yield_every
+            paused.release()
+            resumed.acquire()
+            if cancelled:
+                raise _ParseCancelled()
+
+        def run() -> None:
+            resumed.acquire()
+            try:
+                outcome.append(self.parse())
+            except BaseException as e:
+                outcome.append(e)
+            finally:
+                paused.release()
+
+        # Only rules parsed through a new handler pause, so the handlers are set aside while parsing, to be restored after.
+        handlers, self._handlers = self._handlers, {}
+        self._pause, self._ticks = pause, yield_every
+        thread = threading.Thread(target=run, name="SParLex aparse", daemon=True)
+        thread.start()
+        try:
+            while True:
+                resumed.release()
+                paused.acquire()
+                if outcome:
+                    break
+                await asyncio.sleep(0)
+
+        except asyncio.CancelledError:
+            cancelled = True
+            resumed.release()
+            thread.join()
+            self._index, self._examined, self._error = 0, -1, ParserErrors.SyntaxError()
+            self._memo.clear()
+            raise
+
+        finally:
+            self._handlers, self._pause = handlers, None
+
+        if isinstance(outcome[0], BaseException):
+            raise outcome[0]
+        return outcome[0]
+
+    def reparse(self, tokens: TokenStream, edit: TokenEdit) -> RootAst:
+        """
+        Parse the tokens that Lexer.relex produced from this Parser's tokens, giving the same AST (or error) as a new
+        Parser would. With packrat parsing enabled, the memoized result of every rule that only examined unchanged
+        tokens is reused: as it is, before the edit, or as a copy with its positions moved along, after it. Rules must
+        therefore only read tokens through parse_token (directly or via other rules), which is what records which tokens
+        a rule examined. ASTs reused as they are are shared with the previous parse's AST, as are their tokens, whose
+        text and span are unchanged; the tokens of copies are those of the new tokens.
+
+        Example:
+            - tokens, edit = Lexer.relex(tokens, offset, removed, inserted)
+            - ast = parser.reparse(tokens, edit)
+        """
+
+        # Memo entries are keyed by the id of the token they started at, and store positions relative to it, so entries
+        # after the edit move along with their tokens' ids. The edited tokens get new ids, as do tokens before the edit
+        # with an entry that examined tokens from the edit onwards, which makes those entries unreachable.
+        start, old_end, new_end = edit.start, edit.old_end, edit.new_end
+        token_ids, reach = self._token_ids, self._memo_reach
+        for position in range(start):
+            if position + reach[position] >= start:
+                token_ids[position], reach[position] = self._next_token_id, -1
+                self._next_token_id += 1
+
+        new_ids = array("Q", range(self._next_token_id, self._next_token_id + new_end - start))
+        self._next_token_id += new_end - start
+        self._token_ids = token_ids[:start] + new_ids + token_ids[old_end:]
+        self._memo_reach = reach[:start] + array("q", [-1]) * (new_end - start) + reach[old_end:]
+
+        # Results parsed from a list of tokens don't know their tokens' offsets in the source, so can't be moved along.
+        if not isinstance(self._tokens, TokenStream):
+            self._memo.clear()
+
+        # Splice the trivia distances: those up to the last significant token before the edit, and those from the end
+        # of the edit onwards, are unchanged.
+        old_next_significant, old_next_non_whitespace = self._next_significant, self._next_non_whitespace
+        self._tokens = tokens
+        self._kinds = tokens.kinds
+        self._token_len = len(tokens)
+        self._err_fmt = ErrorFormatter(self._token_set, tokens, self._name)
+
+        begin = start
+        while begin > 0 and self._kinds[begin - 1] in (self._whitespace_kind, self._newline_kind):
+            begin -= 1
+        if new_end < self._token_len:
+            significant, non_whitespace = new_end + old_next_significant[old_end], new_end + old_next_non_whitespace[old_end]
+        else:
+            significant = non_whitespace = self._token_len
+        next_significant, next_non_whitespace = self._trivia_distances(begin, new_end, significant, non_whitespace)
+        self._next_significant = old_next_significant[:begin] + next_significant + old_next_significant[old_end:]
+        self._next_non_whitespace = old_next_non_whitespace[:begin] + next_non_whitespace + old_next_non_whitespace[old_end:]
+
+        self._index = 0
+        self._examined = -1
+        self._error = ParserErrors.SyntaxError()
+        return self.parse()
+
+    # ===== ERROR RECOVERY =====
+
+    def _parse_recovering(self) -> RootAst:
+        """
+        Parse the tokens again, after a recovering Parser's first parse failed, recovering from every syntax error, to
+        return a partial AST and record all the errors (see "errors") in one pass. Recovery happens in repetitions of
+        rules declared with "@parser_rule(recover=True)", ie statements: an item that fails after parsing at least one
+        token, with its error at or after the first parse's error, is taken to have a syntax error, rather than to be the
+        end of the repetition. The tokens from the item's start are skipped, up to and including the next sync token
+        (newlines, unless the Parser was given "sync_tokens"), and the item is replaced by an ErrorAst, holding the error
+        recorded by the item. Tokens left over after the root rule are skipped the same way, and the root rule is parsed
+        again after them. The first root's AST is the RootAst's "root_ast", and the ErrorAsts of the skipped tokens and
+        the ASTs of the roots after them are its "recovered" ASTs, in order.
+
+        Up to the first parse's error, this parse is the same as the first, so the first error is always the one parsing
+        without recovery raises. After it, a recovering rule whose repetition may end with an item that fails after
+        parsing tokens which the rest of the rule then parses (ie "{ a; b; c }" as a repetition of "x ;" followed by "x")
+        recovers there when it shouldn't, so reports an error that isn't one. A source without errors is never parsed
+        this way.
+
+        Example:
+            - parser = MyParser(MyTokenType, tokens, recover=True, sync_tokens=[MyTokenType.TkSemicolon])
+            - ast = parser.parse()
+            - for error in parser.format_errors(): print(error)
+        """
+
+        # Memoized results are from the first parse, which didn't recover, and results from this parse must not be reused
+        # by a parse that doesn't, so this parse has a memo of its own.
+        memo, self._memo = self._memo, OrderedDict()
+        self._recovering = True
+        self._errors = [self._error]
+        roots, last = [], self._token_len - 1
+        try:
+            self._index = 0
+            while True:
+                start, self._error = self._index, ParserErrors.SyntaxError()
+                if (p1 := self.parse_root().try_parse()) is not FAILURE:
+                    roots.append(p1)
+                    start = self._index
+                    if (p2 := self.parse_eof().try_parse()) is not FAILURE:
+                        break
+
+                # Skip to the sync token after the error, replacing the tokens from where the root failed, or ended, with
+                # an ErrorAst.
+                error, end = self._error, self._skip_to_sync(max(self._error.pos, start))
+                self._errors.append(error)
+                roots.append(ErrorAst(start, error, [TokAst(i, self._tokens[i]) for i in range(start, end)]))
+
+                self._index = end
+                if start >= last:
+                    if (p2 := self.parse_eof().try_parse()) is FAILURE:
+                        self._errors[0].throw(self._err_fmt)
+                    break
+        finally:
+            self._memo, self._recovering = memo, False
+
+        # Errors recovered from more than once, by rules that were backtracked and parsed again, are only kept once.
+        errors = {}
+        for error in self._errors:
+            errors.setdefault(error.pos, error)
+        self._errors = sorted(errors.values(), key=lambda error: error.pos)
+        return RootAst(0, roots[0], p2, roots[1:])
+
+    def _parse_item_recovering[T](self, handler: ParserRuleHandler[T]) -> T | ErrorAst | FAILURE:
+        # Parse an item of a repetition, against a fresh error, so the error the item recorded is known. If it failed after
+        # its first token, at or after the first error, replace it with an ErrorAst, and resume after the next sync token,
+        # recording the error instead of merging it.
+        start = self._index
+        lookahead = start + self._next_significant[start] if start < self._token_len else start
+        outer_error, self._error = self._error, ParserErrors.SyntaxError()
+        try:
+            ast = handler.try_parse()
+        finally:
+            error, self._error = self._error, outer_error
+
+        if ast is not FAILURE or error.pos <= lookahead or error.pos < self._errors[0].pos or lookahead >= self._token_len - 1:
+            self._merge_error(error.pos, error.args, tuple(error.expected_tokens))
+            return ast
+
+        self._index = self._skip_to_sync(error.pos)
+        self._errors.append(error)
+        return ErrorAst(lookahead, error, [TokAst(i, self._tokens[i]) for i in range(lookahead, self._index)])
+
+    def _skip_to_sync(self, pos: int) -> int:
+        # The position after the first sync token from "pos", or of the last (EOF) token if there isn't one.
+        kinds, sync_kinds, last = self._kinds, self._sync_kinds, self._token_len - 1
+        pos = min(pos, last)
+        while pos < last and kinds[pos] not in sync_kinds:
+            pos += 1
+        return pos + 1 if pos < last else last
 
     @parser_rule
     @abstractmethod
     def parse_root(self) -> Ast:
         ...
 
-    @parser_rule
+    @parser_rule(packrat=False, predict=False)
     def parse_eof(self) -> TokAst:
-        p1 = self.parse_token(SpecialToken.EOF).parse_once()
+        p1 = self.parse_token(SpecialToken.EOF).try_parse()
         return p1
 
-    # ===== TOKENS, KEYWORDS, & LEXEMES =====
+    # ===== PACKRAT PARSING =====
+
+    def _parse_memoized[T](self, func: Callable[..., T], args: Tuple) -> T:
+        # Replay a previous attempt of this rule at this position: its result (or failure), where it left the index (a
+        # failed rule needn't restore it), the error it recorded, and the furthest token it examined, which are stored
+        # relative to the position. A result reused after an edit moved its tokens is copied when it's replayed, with its
+        # positions moved from where it was parsed (its origin), and its tokens read from the new tokens. So is a result
+        # whose tokens kept their positions but not their offsets in the source.
+        index = self._index
+        key = (func, args, self._token_ids[index])
+        try:
+            entry = self._memo.get(key)
+        except TypeError:
+            return func(self, *args)
+
+        if entry is not None:
+            self._memo.move_to_end(key)
+            result, end, (error_pos, *error), examined, origin, tokens = entry
+            if tokens is not self._tokens:
+                if origin != index or index < self._token_len and tokens.starts[origin] != self._tokens.starts[index]:
+                    result = _shifted(result, index - origin, self._tokens)
+                self._memo[key] = (result, end, (error_pos, *error), examined, index, self._tokens)
+            self._merge_error(-1 if error_pos is None else index + error_pos, *error)
+            self._examined = max(self._examined, index + examined)
+            self._index = index + end
+            return result
+
+        # Parse the rule against a fresh error, so the error this attempt would record on its own can be stored. Merging
+        # it back gives the same furthest error as parsing the rule again would.
+        outer_error, self._error = self._error, ParserErrors.SyntaxError()
+        outer_examined, self._examined = self._examined, -1
+        try:
+            result = func(self, *args)
+        except ParserFailure:
+            result = FAILURE
+        end = self._index
+
+        error = (self._error.pos, self._error.args, tuple(self._error.expected_tokens))
+        self._error = outer_error
+        self._merge_error(*error)
+        examined, self._examined = max(self._examined, index - 1) - index, max(outer_examined, self._examined)
+        self._memo_reach[index] = max(self._memo_reach[index], examined)
+
+        # Store the entry, evicting the least recently used one once the memo is full.
+        error = (None if error[0] < 0 else error[0] - index, *error[1:])
+        self._memo[key] = (result, end - index, error, examined, index, self._tokens)
+        if len(self._memo) > self._memo_size:
+            self._memo.popitem(last=False)
+        return result
+
+    # ===== FIRST-SET PREDICTION =====
+
+    @staticmethod
+    def _first_sets_for(parser_class: type, token_set: Type[TokenType]) -> Dict:
+        # What is learnt about a rule holds for every Parser of the same class and token set, so it's shared by them.
+        return Parser._first_sets.setdefault((parser_class, token_set), {})
+
+    def _predicts_failure(self, key: Tuple[Callable, Tuple]) -> bool:
+        # A rule is known to fail if it has failed before on the same lookahead token, having examined only that token
+        # (see _learn_failure). Record the error the failed attempt would have recorded, and leave the index where it would
+        # have left it (a failed rule needn't restore it), without attempting it.
+        start = self._index
+        if start >= self._token_len:
+            return False
+        lookahead = start + self._next_significant[start]
+        if lookahead >= self._token_len or start + self._next_non_whitespace[start] != lookahead:
+            return False
+
+        try:
+            exclusions = self._first_set_exclusions.get(key)
+        except TypeError:
+            return False
+        if exclusions is None or (entry := exclusions.get(self._kinds[lookahead])) is None:
+            return False
+        args, expected_tokens, skipped = entry
+        if skipped is None and lookahead != start:
+            return False
+        self._merge_error(lookahead, args, expected_tokens)
+        self._examined = max(self._examined, lookahead)
+        if skipped:
+            self._index = lookahead
+        return True
+
+    def _learn_failure(self, key: Tuple[Callable, Tuple], start: int, error_pos: int) -> None:
+        # If a failed attempt's furthest error is on the lookahead token, with only whitespace before it, the attempt
+        # can't have examined any other token, so the rule fails whenever this token type is the lookahead: it isn't in
+        # the rule's FIRST set. The error must also be the one parse_token records, so it can be replayed exactly, as
+        # must where the attempt left the index: where it started, or on the lookahead (past the whitespace). That's only
+        # known from an attempt with whitespace before the lookahead, so until one fails, the rule is only predicted to
+        # fail where there is none.
+        if start >= self._token_len:
+            return
+        lookahead = start + self._next_significant[start]
+        if not error_pos < lookahead == self._error.pos or start + self._next_non_whitespace[start] != lookahead or not self._error.expected_tokens:
+            return
+        if self._error.args != (f"Expected £, got '{self._table.types[self._kinds[lookahead]].name}'",):
+            return
+
+        try:
+            exclusions = self._first_set_exclusions.setdefault(key, {})
+        except TypeError:
+            return
+        skipped = None if lookahead == start else self._index == lookahead
+        if skipped is None and (entry := exclusions.get(self._kinds[lookahead])) is not None:
+            skipped = entry[2]
+        exclusions[self._kinds[lookahead]] = (self._error.args, tuple(self._error.expected_tokens), skipped)
+
+    def _parse_predicted[T](self, func: Callable[..., T], args: Tuple, memoize: bool) -> T:
+        key = (func, args)
+        if self._predicts_failure(key):
+            return FAILURE
+
+        start, error_pos = self._index, self._error.pos
+        try:
+            result = self._parse_memoized(func, args) if memoize else func(self, *args)
+        except ParserFailure:
+            result = FAILURE
+        if result is FAILURE:
+            self._learn_failure(key, start, error_pos)
+        return result
+
+    def _merge_error(self, pos: int, args: Tuple, expected_tokens: Tuple[TokenType, ...]) -> None:
+        if pos > self._error.pos:
+            self._error.pos = pos
+            self._error.args = args
+            self._error.expected_tokens[:] = expected_tokens
+        elif pos == self._error.pos:
+            self._error.expected_tokens.extend(expected_tokens)
+
+    # ===== OPERATOR PRECEDENCE =====
 
     @parser_rule
+    def parse_operators(self, operators: OperatorTable, operand: Callable[[], ParserRuleHandler]) -> Ast:
+        """
+        Parse an expression of operands separated and surrounded by the prefix, infix and postfix operators of the
+        table, applying them by precedence and associativity. The operand is called to get the ParserRuleHandler for
+        each operand (ie a bound rule, "self.parse_primary"), and parenthesised expressions are left to it. Operators
+        are applied with an explicit stack, in one loop, so neither the number of precedence levels nor the length of
+        an expression adds rule calls or recursion.
+
+        As with the equivalent rules, an infix or postfix operator that isn't followed by what it needs is left
+        unparsed, and after the expression, every infix and postfix operator is recorded as an expected token.
+
+        Example:
+            - return self.parse_operators(OPERATORS, self.parse_primary).parse_once()
+        """
+
+        prefixes, suffixes, expected = operators.compiled(self._table)
+        pending: List[Tuple[Operator, TokAst, Optional[Ast], int]] = []
+        resume: Optional[Tuple[int, int]] = None
+
+        while True:
+            # Parse any prefix operators, and the operand. If an operand after an infix operator fails, go back to the
+            # infix operator, and end the expression before it.
+            start = self.current_pos()
+            while (operator := prefixes.get(self._peek_kind())) is not None:
+                pending.append((operator, self.parse_token(operator.token_type).parse_once(), None, start))
+                start = self.current_pos()
+
+            value = operand().try_parse()
+            if value is FAILURE:
+                if resume is None:
+                    return FAILURE
+                self._index, size = resume
+                _, _, value, start = pending[size]
+                del pending[size:]
+                break
+
+            # Parse postfix operators, until an infix operator (to parse the next operand) or the end of the expression.
+            # Pending operators that bind at least as tightly as the new one are applied first.
+            while (operator := suffixes.get(self._peek_kind())) is not None:
+                while pending and (pending[-1][0].precedence > operator.precedence or pending[-1][0].precedence == operator.precedence and not operator.right):
+                    value, start = _apply_operator(*pending.pop(), value)
+                index = self._index
+                token = self.parse_token(operator.token_type).parse_once()
+                if operator.fixity == "infix":
+                    resume = (index, len(pending))
+                    pending.append((operator, token, value, start))
+                    break
+
+                suffix = operator.rule(self).try_parse() if operator.rule else None
+                if suffix is FAILURE:
+                    self._index = index
+                    break
+                value = operator.build(start, value, token, suffix)
+            else:
+                self._expect_tokens(expected)
+
+            if operator is None or operator.fixity != "infix":
+                break
+
+        while pending:
+            value, start = _apply_operator(*pending.pop(), value)
+        return value
+
+    def _peek_kind(self) -> int:
+        # The kind of the next token that isn't a newline or whitespace, without parsing it, or -1 at the end of the file.
+        # Recorded as examined, as parse_token would.
+        if self._index >= self._token_len:
+            return -1
+        lookahead = self._index + self._next_significant[self._index]
+        if lookahead > self._examined:
+            self._examined = lookahead
+        return self._kinds[lookahead]
+
+    def _expect_tokens(self, token_types: Tuple[TokenType, ...]) -> None:
+        # Record the error that failing to parse each of the token types here would, without attempting them.
+        if not token_types:
+            return
+        if self._index >= self._token_len:
+            self.store_error(self._index, f"Expected '{token_types[0]}', got <EOF>")
+            return
+        lookahead = self._index + self._next_significant[self._index]
+        if self._error.pos == lookahead or self.store_error(lookahead, f"Expected £, got '{self._table.types[self._kinds[lookahead]].name}'"):
+            self._error.expected_tokens.extend(token_types)
+
+    # ===== TOKENS, KEYWORDS, & LEXEMES =====
+
+    @parser_rule(packrat=False, predict=False)
     def parse_lexeme(self, lexeme: TokenType) -> TokAst:
-        p1 = self.parse_token(lexeme).parse_once()
+        p1 = self.parse_token(lexeme).try_parse()
         return p1
 
-    @parser_rule
+    @parser_rule(packrat=False, predict=False)
     def parse_token(self, token_type: TokenType) -> TokAst:
         # For the "no token", instantly return a new token.
-        if token_type == SpecialToken.NO_TOK:
+        if token_type is SpecialToken.NO_TOK:
             return TokAst(self.current_pos(), Token("", SpecialToken.NO_TOK))
 
-        # Check if the end of the file has been reached.
+        # Check if the end of the file has been reached. Failures are returned, not raised (see ParserFailure).
         if self._index >= self._token_len:
             new_error = f"Expected '{token_type}', got <EOF>"
             self.store_error(self.current_pos(), new_error)
-            raise self._error
+            self._examined = max(self._examined, self._index)
+            return FAILURE
 
-        # Skip newlines and whitespace for non-newline parsing, and whitespace only for new-line parsing.
-        if token_type != self._newline_token:
-            while self._tokens[self._index].token_type == self._newline_token or self._tokens[self._index].token_type == self._whitespace_token:
-                self._index += 1
-        if token_type == self._newline_token:
-            while self._tokens[self._index].token_type == self._whitespace_token:
-                self._index += 1
+        # Skip newlines and whitespace for non-newline parsing, and whitespace only for new-line parsing. Record how far
+        # the tokens have been examined, for reparse.
+        kinds, index = self._kinds, self._index
+        if token_type is not self._newline_token:
+            self._index = index = index + self._next_significant[index]
+        else:
+            self._index = index = index + self._next_non_whitespace[index]
+        if index > self._examined:
+            self._examined = index
 
         # Handle an incorrectly placed token.
-        if self._tokens[self._index].token_type != token_type:
+        if kinds[index] != self._table.ordinals.get(token_type):
             if self._error.pos == self._index:
                 self._error.expected_tokens.append(token_type)
-                raise self._error
+                return FAILURE
 
-            new_error = f"Expected £, got '{self._tokens[self._index].token_type.name}'"
+            new_error = f"Expected £, got '{self._table.types[kinds[self._index]].name}'"
             if self.store_error(self._index, new_error):
                 self._error.expected_tokens.append(token_type)
-            raise self._error
+            return FAILURE
 
         # Otherwise, the parse was successful, so return a TokenAst as the correct position.
         r = TokAst(self._index, self._tokens[self._index])
@@ -126,4 +738,43 @@ class Parser(ABC):
         return False
 
 
+class _ParseCancelled(BaseException):
+    # Raised inside a cancelled aparse, to unwind the parse. Not a ParserFailure, so no rule catches it.
+    pass
+
+
+def _parse(parser_class: Type[Parser], token_set: Type[TokenType], tokens: List[Token] | TokenStream, file_name: str, options: Dict[str, Any]) -> Tuple[RootAst, List[ParserErrors.SyntaxError]]:
+    # Runs in the executor of Parser.aparse.
+    parser = parser_class(token_set, tokens, file_name, **options)
+    return parser.parse(), parser.errors()
+
+
+def _apply_operator(operator: Operator, token: TokAst, lhs: Optional[Ast], start: int, rhs: Ast) -> Tuple[Ast, int]:
+    # Build a pending prefix (without a left-hand side) or infix operator's Ast, which starts where the operator did.
+    return (operator.build(start, token, rhs) if lhs is None else operator.build(start, lhs, token, rhs)), start
+
+
+def _shifted(value: Any, delta: int, tokens: List[Token] | TokenStream) -> Any:
+    # Copy a rule's result with the position of every Ast in it moved along by "delta", for reuse after an edit. A token
+    # read from the previous token stream is replaced by the one at its new position in "tokens", so its text and span
+    # are read from the edited source.
+    if isinstance(value, Ast):
+        value = copy.copy(value)
+        names = {field.name for field in dataclasses.fields(value)} | set(getattr(value, "__dict__", ()))
+        for name in names - {"_end"}:
+            object.__setattr__(value, name, _shifted(getattr(value, name), delta, tokens))
+        if value.pos >= 0:
+            object.__setattr__(value, "pos", value.pos + delta)
+        if getattr(value, "_end", -1) >= 0:
+            object.__setattr__(value, "_end", value._end + delta)
+        if isinstance(value, TokAst) and value.pos >= 0 and value.token.source is not None:
+            object.__setattr__(value, "token", tokens[value.pos])
+        return value
+    if isinstance(value, list):
+        return [_shifted(item, delta, tokens) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_shifted(item, delta, tokens) for item in value)
+    return value
+
+
 __all__ = ["Parser", "parser_rule"]
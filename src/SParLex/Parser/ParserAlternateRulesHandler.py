@@ -3,6 +3,7 @@ from typing import List, Optional, TYPE_CHECKING, Tuple
 
 from SParLex.Lexer.Tokens import TokenType
 
+from SParLex.Parser.ParserFailure import FAILURE, ParserFailure
 from SParLex.Parser.ParserRuleHandler import ParserRuleHandler
 
 if TYPE_CHECKING:
@@ -22,32 +23,28 @@ class ParserAlternateRulesHandler[T](ParserRuleHandler[T]):
         self._parser_rule_handlers.append(parser_rule_handler)
         return self
 
-    def parse_once(self) -> T:
-        from SParLex.Parser.ParserError import ParserError
-
+    def try_parse(self) -> T | FAILURE:
         for parser_rule_handler in self._parser_rule_handlers:
             parser_index = self._parser._index
-            try:
-                ast = parser_rule_handler.parse_once()
+            if not parser_rule_handler.predicts_failure() and (ast := parser_rule_handler.try_parse()) is not FAILURE:
                 return ast
-            except ParserError:
-                self._parser._index = parser_index
-                continue
+            self._parser._index = parser_index
 
         self._parser.store_error(self._parser._index, "Expected one of the alternatives.")
-        raise self._parser._error
+        return FAILURE
 
-    def parse_optional(self) -> Optional[T]:
-        from SParLex.Parser.ParserError import ParserError
+    def parse_once(self) -> T:
+        ast = self.try_parse()
+        if ast is FAILURE:
+            raise self._parser._failure.with_traceback(None)
+        return ast
 
+    def parse_optional(self) -> Optional[T]:
         for parser_rule_handler in self._parser_rule_handlers:
             parser_index = self._parser._index
-            try:
-                ast = parser_rule_handler.parse_optional()
+            if not parser_rule_handler.predicts_failure() and (ast := parser_rule_handler.parse_optional()) is not None:
                 return ast
-            except ParserError:
-                self._parser._index = parser_index
-                continue
+            self._parser._index = parser_index
         return None
 
     def parse_zero_or_more(self, separator: TokenType, *, propagate_error: bool = False) -> List[T] | Tuple[List[T], ParserError]:
@@ -1,12 +1,16 @@
 from __future__ import annotations
-from ordered_set import OrderedSet
-from typing import List, NoReturn
+from typing import List, NoReturn, TYPE_CHECKING
 
 from SParLex.Lexer.Tokens import TokenType
-from SParLex.Utils.ErrorFormatter import ErrorFormatter
+from SParLex.Parser.ParserFailure import ParserFailure
 
+if TYPE_CHECKING:
+    from SParLex.Utils.ErrorFormatter import ErrorFormatter
 
-class ParserError(BaseException):
+
+# A ParserFailure, so a rule that raises one (eg "raise self._error") still just fails, as it did before failures were
+# returned as FAILURE.
+class ParserError(ParserFailure):
     def __init__(self, *args) -> None:
         super().__init__(*args)
 
@@ -26,6 +30,12 @@ class ParserErrors:
             self.expected_tokens = []
 
         def throw(self, error_formatter: ErrorFormatter) -> NoReturn:
+            raise self.format(error_formatter) from None
+
+        def format(self, error_formatter: ErrorFormatter) -> ParserError:
+            # Imported here, as it's only needed once a parse has failed.
+            from ordered_set import OrderedSet
+
             # Convert the list of expected tokens into a set of strings.
             all_expected_tokens = OrderedSet([t.print() for t in self.expected_tokens])
             all_expected_tokens = "{'" + "' | '".join(all_expected_tokens).replace("\n", "\\n") + "'}"
@@ -33,6 +43,4 @@ class ParserErrors:
             # Replace the "$" token with the set of expected tokens.
             error_message = str(self).replace("£", all_expected_tokens)
             error_message = error_formatter.error(self.pos, message=error_message, tag_message="Syntax Error")
-
-            # Raise the error.
-            raise ParserError(error_message) from None
+            return ParserError(error_message)
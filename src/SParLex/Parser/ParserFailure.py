@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Final
+
+
+class _Failure:
+    __slots__ = []
+
+    def __repr__(self) -> str:
+        return "FAILURE"
+
+
+# Returned (not raised) by rules and ParserRuleHandlers to signal that a parse failed. What was expected is recorded in
+# the Parser's SyntaxError, so the sentinel itself carries nothing. Rules may also return it to fail without raising.
+FAILURE: Final = _Failure()
+
+
+class ParserFailure(BaseException):
+    """
+    ParserFailure is raised when a FAILURE has to leave a user-written rule, ie when "parse_once" fails inside a rule's
+    body, which can only be stopped by an exception. Each Parser raises its own instance, with the traceback cleared so
+    it doesn't grow. It is caught by the nearest ParserRuleHandler and turned back into a FAILURE. Only Parser.parse
+    raises a ParserError, once the whole parse has failed.
+    """
+
+
+__all__ = ["FAILURE", "ParserFailure"]
@@ -0,0 +1,630 @@
+from __future__ import annotations
+
+import ast
+import copy
+import importlib.util
+import inspect
+import os
+import sys
+import tempfile
+import textwrap
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Type
+
+from SParLex.Lexer.Lexer import Lexer
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.Tokens import SpecialToken, TokenType
+from SParLex.Lexer.TokenStream import TokenStream
+from SParLex.Parser.GeneratedParser import GeneratedParser
+from SParLex.Parser.Parser import Parser
+from SParLex.Parser.ParserError import ParserError
+from SParLex.Parser.ParserFailure import FAILURE
+from SParLex.Utils.ParseCache import _fingerprint
+
+
+# A handler expression in a rule: a token (token type, its source), a rule (name, argument nodes), or an alternation of
+# either. Anything else is left to the original ParserRuleHandlers.
+type Handler = Tuple[str, Any, Any]
+
+_METHODS = {"parse_once", "try_parse", "parse_optional", "parse_zero_or_more", "parse_one_or_more", "parse_two_or_more"}
+_MINIMUM = {"parse_one_or_more": 1, "parse_two_or_more": 2}
+
+
+class _ExpressionRewriter(ast.NodeTransformer):
+    # Replaces the handler calls in an expression with calls to the generated rules and GeneratedParser's helpers.
+    def __init__(self, generator: ParserGenerator) -> None:
+        self._generator = generator
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if (replacement := self._generator._expression(node, self)) is not None:
+            return replacement
+        return self.generic_visit(node)
+
+
+class ParserGenerator:
+    """
+    ParserGenerator emits a Python module with a specialised version of a Parser subclass, for a fixed grammar that is
+    parsed often. The generated class subclasses the original (and GeneratedParser), and has a plain method per rule,
+    called directly rather than through parser_rule and a ParserRuleHandler. Token checks are inlined as comparisons of
+    the token ordinals, "parse_optional" and "parse_zero_or_more" as loops, and alternations as a "match" on the
+    lookahead token, which only tries the alternatives that can start with it (by the FIRST sets of the rules).
+
+    The generated parse builds the same ASTs, with the same AST classes. It doesn't record errors, so when it fails,
+    the tokens are parsed again by the original rules, which raise the same ParserError as the original Parser. Rules
+    that can't be generated, such as closures, rules using super(), rules reading the Parser's error, or constructs
+    other than the handler calls above, are left to the original ParserRuleHandlers, which is always correct, but slower.
+
+    The module is importable on its own: it imports the parser's module, and checks that the grammar still has the
+    fingerprint (see ParseCache) it was generated from. ParserGenerator.load caches modules by that fingerprint, and the
+    "compare" method runs both parsers over a corpus, reporting every source they disagree on.
+
+    Example:
+        - MyFastParser = ParserGenerator.load(MyParser, MyTokenType, ".sparlex_generated")
+        - ast = MyFastParser(MyTokenType, tokens).parse()
+        - assert not ParserGenerator(MyParser, MyTokenType).compare(glob("tests/**/*.spp"))
+    """
+
+    _parser_class: Type[Parser]
+    _token_set: Type[TokenType]
+    _table: LexerTable
+    _rules: Dict[str, Tuple[Callable, Optional[bool]]]
+    _trees: Dict[str, ast.FunctionDef]
+    _names: Dict[str, Set[str]]
+    _values: Dict[str, Any]
+    _firsts: Dict[str, Optional[Tuple[FrozenSet[int], bool]]]
+    _bindings: Dict[str, Dict[str, ast.AST]]
+    _current: Optional[str]
+    _temporaries: int
+
+    def __init__(self, parser_class: Type[Parser], token_set: Type[TokenType]) -> None:
+        if "<locals>" in parser_class.__qualname__ or "<locals>" in token_set.__qualname__:
+            raise ValueError("The parser class and token set must be defined at a module's top level.")
+
+        self._parser_class = parser_class
+        self._token_set = token_set
+        self._table = LexerTable.of(token_set)
+        self._rules = {}
+        self._trees = {}
+        self._names = {}
+        self._values = {}
+        self._firsts = {}
+        self._bindings = {}
+        self._current = None
+        self._temporaries = 0
+
+        # Collect the rules defined by the parser class and its bases (other than Parser's own), and parse those that
+        # can be generated.
+        for cls in parser_class.__mro__:
+            if issubclass(Parser, cls) or cls is GeneratedParser:
+                continue
+            for name, attribute in vars(cls).items():
+                if name not in self._rules and hasattr(attribute, "parser_rule_options"):
+                    self._rules[name] = (attribute.__wrapped__, attribute.parser_rule_options[0])
+        for name, (func, _) in self._rules.items():
+            if (tree := self._parse_rule(func)) is not None:
+                self._trees[name] = tree
+                self._bindings[name] = self._find_bindings(tree)
+
+    @classmethod
+    def load(cls, parser_class: Type[Parser], token_set: Type[TokenType], directory: str | os.PathLike) -> Type[GeneratedParser]:
+        # Import the generated parser from the directory, generating it first if this version of the grammar hasn't been.
+        fingerprint = _fingerprint(token_set, parser_class).hex()[:16]
+        module_name = f"_sparlex_generated_{parser_class.__name__}_{fingerprint}"
+        path = os.path.join(os.fspath(directory), f"{module_name}.py")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            cls(parser_class, token_set).write(path)
+
+        if (module := sys.modules.get(module_name)) is None:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+        return getattr(module, f"{parser_class.__name__}Generated")
+
+    def write(self, path: str | os.PathLike) -> None:
+        # Written to a temporary file and renamed into place, so a concurrent load never imports a partial module.
+        path = os.fspath(path)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            file.write(self.generate())
+        os.replace(temporary_path, path)
+
+    def compare(self, corpus: Iterable[str | TokenStream], generated: Optional[Type[GeneratedParser]] = None, **parser_kwargs: Any) -> List[Tuple[int, str, str]]:
+        """
+        Parse every source (or TokenStream) of the corpus with the original and the generated parser, and return the
+        index of each one they disagree on, with the outcome of each: the AST's repr, or the error. The generated parser
+        is the one this generator emits, unless given. Its own parse is compared, not the fallback to the original.
+        """
+
+        if generated is None:
+            namespace = {}
+            exec(compile(self.generate(), f"<{self._parser_class.__name__}Generated>", "exec"), namespace)
+            generated = namespace[f"{self._parser_class.__name__}Generated"]
+
+        mismatches = []
+        for index, source in enumerate(corpus):
+            tokens = source if isinstance(source, TokenStream) else Lexer(source, self._token_set).lex()
+            try:
+                expected = repr(self._parser_class(self._token_set, tokens, **parser_kwargs).parse())
+            except ParserError as e:
+                expected = f"error: {e}"
+            actual = generated(self._token_set, tokens, **parser_kwargs)._g_parse()
+            actual = "error" if actual is FAILURE else repr(actual)
+            if actual != expected and not (actual == "error" and expected.startswith("error: ")):
+                mismatches.append((index, expected, actual))
+        return mismatches
+
+    # ===== MODULE =====
+
+    def generate(self) -> str:
+        parser_class, token_set = self._parser_class, self._token_set
+        class_name = f"{parser_class.__name__}Generated"
+        methods = [self._generate_rule(name, tree) for name, tree in self._trees.items()]
+
+        lines = [
+            f"# Generated by SParLex's ParserGenerator from {parser_class.__module__}.{parser_class.__qualname__}, for",
+            f"# {token_set.__module__}.{token_set.__qualname__}. Don't edit: generate it again when the grammar changes.",
+            "import importlib as _sp_importlib",
+            "import sys as _sp_sys",
+            "",
+            "from SParLex.Ast import Ast as _sp_Ast, TokAst as _sp_TokAst",
+            "from SParLex.Lexer.Tokens import SpecialToken as _sp_SpecialToken, Token as _sp_Token",
+            "from SParLex.Parser.GeneratedParser import GeneratedParser as _sp_GeneratedParser",
+            "from SParLex.Parser.ParserFailure import FAILURE as _sp_FAILURE, ParserFailure as _sp_ParserFailure",
+            "from SParLex.Utils.ParseCache import _fingerprint as _sp_fingerprint",
+            "",
+            "",
+            "def _sp_resolve(module, qualname):",
+            "    value = _sp_sys.modules.get(module) or _sp_importlib.import_module(module)",
+            "    for part in qualname.split(\".\"):",
+            "        value = getattr(value, part)",
+            "    return value",
+            "",
+            "",
+            "# The names the rules use from their modules.",
+            f"for _sp_module, _sp_names in {dict((m, sorted(n)) for m, n in sorted(self._names.items()))!r}.items():",
+            "    globals().update({_sp_name: _sp_resolve(_sp_module, _sp_name) for _sp_name in _sp_names})",
+            "",
+            f"_sp_parser_class = _sp_resolve({parser_class.__module__!r}, {parser_class.__qualname__!r})",
+            f"_sp_token_set = _sp_resolve({token_set.__module__!r}, {token_set.__qualname__!r})",
+            f"if _sp_fingerprint(_sp_token_set, _sp_parser_class).hex() != {_fingerprint(token_set, parser_class).hex()!r}:",
+            f"    raise ImportError(\"{class_name} was generated from another version of the grammar.\")",
+            "",
+            "",
+            f"class {class_name}(_sp_GeneratedParser, _sp_parser_class):",
+            f"    _g_rules = {tuple((f'_g_rule_{name}', self._rules[name][1]) for name in self._trees)!r}",
+            f"    _g_eof = {self._table.ordinals[SpecialToken.EOF]}",
+        ]
+        for method in methods:
+            lines.append("")
+            lines.append(textwrap.indent(method, "    "))
+        if "parse_root" in self._trees:
+            lines.append("")
+            lines.append("    def _g_parse_root(self):")
+            lines.append("        return self._g_rule_parse_root()")
+        lines.append("")
+        lines.append("")
+        lines.append(f"__all__ = [{class_name!r}]")
+        return "\n".join(lines) + "\n"
+
+    def _parse_rule(self, func: Callable) -> Optional[ast.FunctionDef]:
+        # The rule's syntax tree, or None if it can't be generated. The global names it uses are recorded, and must not
+        # clash with those of rules from other modules.
+        code = func.__code__
+        if code.co_freevars or any(name.startswith(("_g_", "_sp_")) for name in code.co_varnames):
+            return None
+        module = sys.modules.get(func.__module__)
+        if module is None or vars(module) is not func.__globals__:
+            return None
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(func))).body[0]
+        except (OSError, TypeError, SyntaxError, IndexError):
+            return None
+        if not isinstance(tree, ast.FunctionDef) or not tree.args.args or tree.args.args[0].arg != "self":
+            return None
+
+        # Rules that read the error (or the result of recording one) depend on it, which the generated parse doesn't keep.
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute) and node.attr in ("_error", "_failure"):
+                return None
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "store_error":
+                if not any(isinstance(s, ast.Expr) and s.value is node for s in ast.walk(tree)):
+                    return None
+
+        names = set()
+        codes = [code]
+        while codes:
+            current = codes.pop()
+            names.update(name for name in current.co_names if name in func.__globals__ and not name.startswith("_sp_"))
+            codes.extend(const for const in current.co_consts if inspect.iscode(const))
+        for name in names:
+            if name in self._values and self._values[name] is not func.__globals__[name]:
+                return None
+        for name in names:
+            self._values[name] = func.__globals__[name]
+        self._names.setdefault(func.__module__, set()).update(names)
+
+        tree.decorator_list = []
+        tree.returns = None
+        for argument in tree.args.posonlyargs + tree.args.args + tree.args.kwonlyargs + [tree.args.vararg, tree.args.kwarg]:
+            if argument is not None:
+                argument.annotation = None
+        return tree
+
+    def _generate_rule(self, name: str, tree: ast.FunctionDef) -> str:
+        # The rule's method: its body with the handler calls replaced, returning FAILURE rather than raising. The rewrite
+        # works on a copy of the tree, so the parsed rules are left as they are, for generating the module again.
+        tree = copy.deepcopy(tree)
+        self._current = name
+        self._temporaries = 0
+        body = "\n".join(ast.unparse(statement) for statement in self._statements(tree.body)) or "pass"
+
+        tree.name, tree.body = f"_g_rule_{name}", [ast.Pass()]
+        lines = [ast.unparse(tree).split("\n")[0]]
+        if "_g_kinds" in body or "_g_len" in body:
+            lines.append("    _g_kinds, _g_next, _g_nnw, _g_len = self._kinds, self._next_significant, self._next_non_whitespace, self._token_len")
+        lines.append("    try:")
+        lines.append(textwrap.indent(body, "        "))
+        lines.append("    except _sp_ParserFailure:")
+        lines.append("        return _sp_FAILURE")
+        return "\n".join(lines)
+
+    # ===== HANDLERS =====
+
+    def _handler(self, node: ast.AST) -> Optional[Handler]:
+        # Recognise a handler expression: "self.parse_token(T)", "self.parse_lexeme(T)" or "self.parse_eof()" with T a
+        # token type known now, "self.<rule>(args)", or an alternation ("a | b") of these, or a variable bound to one.
+        if isinstance(node, ast.Name) and (bound := self._bindings[self._current].get(node.id)) is not None:
+            return self._handler(bound)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+            left, right = self._handler(node.left), self._handler(node.right)
+            if left is None or right is None:
+                return None
+            items = (left[1] if left[0] == "alternatives" else [left]) + (right[1] if right[0] == "alternatives" else [right])
+            return "alternatives", items, None
+
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) and node.func.value.id == "self"):
+            return None
+        if node.keywords or any(isinstance(argument, ast.Starred) for argument in node.args):
+            return None
+
+        rule = node.func.attr
+        if rule in ("parse_token", "parse_lexeme") and len(node.args) == 1 and self._is_base(rule):
+            if (token_type := self._static_token(node.args[0])) is not None:
+                return "token", token_type, ast.unparse(node.args[0])
+        if rule == "parse_eof" and not node.args and self._is_base(rule) and self._is_base("parse_token"):
+            return "token", SpecialToken.EOF, "_sp_SpecialToken.EOF"
+        if rule in self._rules:
+            return "rule", rule, node.args
+        return None
+
+    def _is_base(self, name: str) -> bool:
+        return getattr(self._parser_class, name) is getattr(Parser, name)
+
+    def _static_token(self, node: ast.AST) -> Optional[TokenType | SpecialToken]:
+        # Evaluate a name or attribute (ie "MyTokenType.TkPlus") in the rule's module, if it's a token type.
+        current = node
+        while isinstance(current, ast.Attribute):
+            current = current.value
+        if not isinstance(current, ast.Name) or current.id == "self":
+            return None
+        try:
+            value = eval(compile(ast.Expression(node), "<token>", "eval"), self._rules[self._current][0].__globals__)
+        except Exception:
+            return None
+        return value if isinstance(value, (TokenType, SpecialToken)) and value in self._table.ordinals else None
+
+    def _item(self, handler: Handler, rewriter: ast.NodeTransformer) -> Tuple[str, str]:
+        # The handler as (callable, arguments), for GeneratedParser's helpers, and as a direct call.
+        kind, value, extra = handler
+        if kind == "token":
+            return "self._g_token", f"({self._table.ordinals[value]}, {extra})"
+        arguments = ", ".join(ast.unparse(rewriter.visit(argument)) for argument in extra)
+        if value in self._trees:
+            return f"self._g_rule_{value}", f"({arguments}{',' if extra else ''})"
+        return f"self.{value}({arguments}).try_parse", "()"
+
+    def _call(self, handler: Handler, rewriter: ast.NodeTransformer) -> str:
+        # The handler's "try_parse", as a direct call.
+        kind, value, extra = handler
+        if kind == "token":
+            return f"self._g_token({self._table.ordinals[value]}, {extra})"
+        arguments = ", ".join(ast.unparse(rewriter.visit(argument)) for argument in extra)
+        if value in self._trees:
+            return f"self._g_rule_{value}({arguments})"
+        return f"self.{value}({arguments}).try_parse()"
+
+    def _separator(self, node: List[ast.AST]) -> Tuple[bool, Optional[TokenType | SpecialToken]]:
+        # The separator of a repetition, if it's a token type known now.
+        if len(node) != 1:
+            return False, None
+        token_type = self._static_token(node[0])
+        return token_type is not None, token_type
+
+    # ===== EXPRESSIONS =====
+
+    def _expression(self, node: ast.Call, rewriter: ast.NodeTransformer) -> Optional[ast.AST]:
+        # A handler method call anywhere in an expression, as a call to a helper, which raises on failure if the method
+        # would have. "self.current_pos()" is read directly.
+        if not isinstance(node.func, ast.Attribute):
+            return None
+        if node.func.attr == "current_pos" and not node.args and isinstance(node.func.value, ast.Name) and node.func.value.id == "self" and self._is_base("current_pos"):
+            return ast.parse("self._index", mode="eval").body
+        if node.func.attr not in _METHODS or (handler := self._handler(node.func.value)) is None or node.keywords:
+            return None
+
+        method, kind = node.func.attr, handler[0]
+        if kind == "alternatives":
+            items = "(" + "".join(f"({func}, {arguments}), " for func, arguments in (self._item(h, rewriter) for h in handler[1])) + ")"
+            text = {"parse_once": f"self._g_once(self._g_first_of({items}))", "try_parse": f"self._g_first_of({items})", "parse_optional": f"self._g_optional_of({items})"}.get(method)
+        elif method in ("parse_once", "try_parse"):
+            text = self._call(handler, rewriter)
+            text = f"self._g_once({text})" if method == "parse_once" else text
+        elif method == "parse_optional":
+            text = "self._g_optional({}, {})".format(*self._item(handler, rewriter))
+        else:
+            known, separator = self._separator(node.args)
+            if not known:
+                return None
+            separator = "None" if separator is SpecialToken.NO_TOK else f"(self._g_token, ({self._table.ordinals[separator]}, {ast.unparse(node.args[0])}))"
+            func, arguments = self._item(handler, rewriter)
+            text = f"self._g_zero_or_more({func}, {arguments}, {separator})" if method == "parse_zero_or_more" else f"self._g_at_least({_MINIMUM[method]}, {func}, {arguments}, {separator})"
+        if text is None:
+            return None
+        return ast.parse(text, mode="eval").body
+
+    # ===== STATEMENTS =====
+
+    def _statements(self, statements: List[ast.stmt]) -> List[ast.stmt]:
+        result = []
+        for statement in statements:
+            result.extend(self._statement(statement))
+        return result
+
+    def _statement(self, statement: ast.stmt) -> List[ast.stmt]:
+        # Assignments, expressions and returns of a single handler method call are inlined, and the bodies of compound
+        # statements are generated in turn. Nested functions and classes are left as they are.
+        rewriter = _ExpressionRewriter(self)
+        value = getattr(statement, "value", None)
+        if isinstance(statement, ast.Assign) and self._handler(statement.targets[0]) is not None:
+            return []
+        if isinstance(statement, (ast.Assign, ast.Expr, ast.Return)) and (inlined := self._inline(statement, value, rewriter)) is not None:
+            return inlined
+
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return [statement]
+        for field in ("body", "orelse", "finalbody"):
+            if getattr(statement, field, None):
+                setattr(statement, field, self._statements(getattr(statement, field)) or [ast.Pass()])
+        for handler in getattr(statement, "handlers", []):
+            handler.body = self._statements(handler.body) or [ast.Pass()]
+        for case in getattr(statement, "cases", []):
+            case.body = self._statements(case.body) or [ast.Pass()]
+
+        for field in ("test", "iter", "value", "subject", "targets", "target", "items", "exc", "msg"):
+            if (child := getattr(statement, field, None)) is not None:
+                setattr(statement, field, [rewriter.visit(c) for c in child] if isinstance(child, list) else rewriter.visit(child))
+
+        # Record where an Ast the rule built ends, as its handler would have.
+        if isinstance(statement, ast.Return) and statement.value is not None:
+            variable = self._temporary()
+            return self._code(
+                f"{variable} = {ast.unparse(statement.value)}\n"
+                f"if {variable} is not _sp_FAILURE and isinstance({variable}, _sp_Ast) and getattr({variable}, '_end', -1) < 0:\n"
+                f"    {variable}._end = self._index\n"
+                f"return {variable}\n")
+        return [statement]
+
+    def _inline(self, statement: ast.stmt, value: Any, rewriter: ast.NodeTransformer) -> Optional[List[ast.stmt]]:
+        if not (isinstance(value, ast.Call) and isinstance(value.func, ast.Attribute) and value.func.attr in _METHODS and not value.keywords):
+            return None
+        if isinstance(statement, ast.Assign) and len(statement.targets) != 1:
+            return None
+        if (handler := self._handler(value.func.value)) is None:
+            return None
+
+        method, kind = value.func.attr, handler[0]
+        if isinstance(statement, ast.Return) and kind == "rule" and method in ("parse_once", "try_parse"):
+            return self._code(f"return {self._call(handler, rewriter)}")
+
+        # Generate into the assignment's target if it's a name, or a temporary otherwise.
+        target = statement.targets[0] if isinstance(statement, ast.Assign) else None
+        variable = target.id if isinstance(target, ast.Name) else self._temporary()
+        if isinstance(statement, ast.Expr) and method == "parse_once" and kind == "token":
+            return self._code(self._token("", handler[1], handler[2], "return _sp_FAILURE"))
+        if kind == "alternatives":
+            if method not in ("parse_once", "try_parse"):
+                return None
+            code = self._dispatch(variable, handler[1], rewriter)
+            if method == "parse_once":
+                code += f"if {variable} is _sp_FAILURE:\n    return _sp_FAILURE\n"
+        elif method == "parse_once" and kind == "token":
+            code = self._token(variable, handler[1], handler[2], "return _sp_FAILURE")
+        elif method in ("parse_once", "try_parse"):
+            code = f"{variable} = {self._call(handler, rewriter)}\n"
+            if method == "parse_once":
+                code += f"if {variable} is _sp_FAILURE:\n    return _sp_FAILURE\n"
+        elif method == "parse_optional":
+            code = (
+                f"_g_s = self._index\n"
+                f"{variable} = {self._call(handler, rewriter)}\n"
+                f"if {variable} is _sp_FAILURE:\n"
+                f"    self._index = _g_s\n"
+                f"    {variable} = None\n")
+        else:
+            known, separator = self._separator(value.args)
+            if not known:
+                return None
+            code = self._repetition(variable, handler, separator, ast.unparse(value.args[0]), rewriter)
+            if method in _MINIMUM:
+                code += f"if len({variable}) < {_MINIMUM[method]}:\n    return _sp_FAILURE\n"
+
+        if isinstance(statement, ast.Return):
+            code += f"return {variable}\n"
+        elif target is not None and not isinstance(target, ast.Name):
+            code += f"{ast.unparse(rewriter.visit(target))} = {variable}\n"
+        return self._code(code)
+
+    def _token(self, variable: str, token_type: TokenType | SpecialToken, source: str, fail: str) -> str:
+        # An inlined parse_token: skip the trivia (moving the index, as parse_token does even when it fails), and compare
+        # the token's ordinal.
+        if token_type is SpecialToken.NO_TOK:
+            return f"{variable} = _sp_TokAst(self._index, _sp_Token('', _sp_SpecialToken.NO_TOK))\n"
+        distances = "_g_nnw" if token_type is self._token_set.newline_token() else "_g_next"
+        return (
+            f"_g_i = self._index\n"
+            f"if _g_i >= _g_len:\n"
+            f"    {fail}\n"
+            f"_g_i += {distances}[_g_i]\n"
+            f"self._index = _g_i\n"
+            f"if _g_kinds[_g_i] != {self._table.ordinals[token_type]}:\n"
+            f"    {fail}\n"
+            f"self._index = _g_i + 1\n"
+            + (f"{variable} = _sp_TokAst(_g_i, self._tokens[_g_i])\n" if variable else ""))
+
+    def _repetition(self, variable: str, handler: Handler, separator: TokenType | SpecialToken, source: str, rewriter: ast.NodeTransformer) -> str:
+        # An inlined parse_zero_or_more: after the first item, a separator must be parsed, and a failed item after one
+        # gives the separator back.
+        separated = separator is not SpecialToken.NO_TOK
+        code = f"{variable} = []\nwhile True:\n"
+        if separated:
+            code += f"    if {variable}:\n" + textwrap.indent(self._token("", separator, source, "break"), "        ")
+        code += f"    _g_v = {self._call(handler, rewriter)}\n    if _g_v is _sp_FAILURE:\n"
+        if separated:
+            code += f"        if {variable}:\n            self._index -= 1\n"
+        code += f"        break\n    {variable}.append(_g_v)\n"
+        return code
+
+    def _dispatch(self, variable: str, handlers: List[Handler], rewriter: ast.NodeTransformer) -> str:
+        # An inlined alternation: a "match" on the lookahead token's ordinal, where each case tries, in order, the
+        # alternatives that can start with that token, or whose FIRST set isn't known. The index is restored after each
+        # failed alternative.
+        firsts = [self._first_of_handler(handler) for handler in handlers]
+        calls = [self._call(handler, rewriter) for handler in handlers]
+
+        def attempts(indices: List[int]) -> str:
+            code, indent = "", ""
+            for position, i in enumerate(indices):
+                code += f"{indent}{variable} = {calls[i]}\n{indent}if {variable} is _sp_FAILURE:\n{indent}    self._index = _g_s\n"
+                indent += "    "
+            return code or "pass\n"
+
+        code = f"_g_s = self._index\n{variable} = _sp_FAILURE\n"
+        known = sorted(set().union(*[first[0] for first in firsts if first is not None and not first[1]]))
+        default = [i for i, first in enumerate(firsts) if first is None or first[1]]
+        if not known:
+            return code + attempts(default)
+
+        cases: Dict[Tuple[int, ...], List[int]] = {}
+        for ordinal in known:
+            cases.setdefault(tuple(i for i, first in enumerate(firsts) if first is None or first[1] or ordinal in first[0]), []).append(ordinal)
+        code += "_g_k = _g_kinds[_g_s + _g_next[_g_s]] if _g_s < _g_len else -1\nmatch _g_k:\n"
+        for indices, ordinals in cases.items():
+            code += f"    case {' | '.join(map(str, ordinals))}:\n" + textwrap.indent(attempts(list(indices)), "        ")
+        code += "    case _:\n" + textwrap.indent(attempts(default), "        ")
+        return code
+
+    @staticmethod
+    def _find_bindings(tree: ast.FunctionDef) -> Dict[str, ast.AST]:
+        # Variables assigned a handler expression once, and only used to call a handler method, ie "p = a | b" followed
+        # by "p.parse_once()". The expression's arguments must not use variables, so it can be evaluated where it's used.
+        stores, uses, candidates = {}, {}, {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                counts = stores if isinstance(node.ctx, ast.Store) else uses
+                counts[node.id] = counts.get(node.id, 0) + 1
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) and isinstance(node.value, (ast.BinOp, ast.Call)):
+                candidates[node.targets[0].id] = node.value
+
+        method_uses = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in _METHODS and isinstance(node.func.value, ast.Name):
+                method_uses[node.func.value.id] = method_uses.get(node.func.value.id, 0) + 1
+
+        bindings = {}
+        for name, value in candidates.items():
+            if stores.get(name) != 1 or uses.get(name, 0) != method_uses.get(name, 0):
+                continue
+            if any(isinstance(node, ast.Name) and node.id != "self" and node.id in stores for node in ast.walk(value)):
+                continue
+            bindings[name] = value
+        return bindings
+
+    def _temporary(self) -> str:
+        self._temporaries += 1
+        return f"_g_t{self._temporaries}"
+
+    @staticmethod
+    def _code(source: str) -> List[ast.stmt]:
+        return ast.parse(source).body
+
+    # ===== FIRST SETS =====
+
+    def _first_of_handler(self, handler: Handler) -> Optional[Tuple[FrozenSet[int], bool]]:
+        # The ordinals of the tokens a handler can start with, and whether it can match nothing, or None if not known.
+        # Tokens parsed with newlines significant look ahead differently, so they aren't known.
+        kind, value, _ = handler
+        if kind == "token":
+            if value is SpecialToken.NO_TOK:
+                return frozenset(), True
+            if value is self._token_set.newline_token():
+                return None
+            return frozenset([self._table.ordinals[value]]), False
+        if kind == "rule":
+            return self._first(value)
+
+        first, nullable = set(), False
+        for item in value:
+            if (item_first := self._first_of_handler(item)) is None:
+                return None
+            first |= item_first[0]
+            nullable = nullable or item_first[1]
+        return frozenset(first), nullable
+
+    def _first(self, name: str) -> Optional[Tuple[FrozenSet[int], bool]]:
+        # A rule's FIRST set, from the handler calls at the start of its body. Rules are only analysed once, and a rule
+        # reached again while it's analysed (left recursion) isn't known.
+        if name in self._firsts:
+            return self._firsts[name]
+        self._firsts[name] = None
+        if (tree := self._trees.get(name)) is None:
+            return None
+
+        outer, self._current = self._current, name
+        try:
+            first, nullable = set(), True
+            for statement in tree.body:
+                value = getattr(statement, "value", None)
+                if isinstance(statement, ast.Expr) and isinstance(value, ast.Constant):
+                    continue
+                if isinstance(statement, ast.Assign) and (self._is_pure(value) or self._handler(statement.targets[0]) is not None):
+                    continue
+                if not isinstance(statement, (ast.Assign, ast.Expr, ast.Return)) or not isinstance(value, ast.Call):
+                    return None
+                if not isinstance(value.func, ast.Attribute) or value.func.attr not in _METHODS:
+                    return None
+                if (handler := self._handler(value.func.value)) is None or (handler_first := self._first_of_handler(handler)) is None:
+                    return None
+
+                first |= handler_first[0]
+                if not handler_first[1] and value.func.attr not in ("parse_optional", "parse_zero_or_more"):
+                    nullable = False
+                    break
+                if isinstance(statement, ast.Return):
+                    break
+            self._firsts[name] = (frozenset(first), nullable)
+            return self._firsts[name]
+        finally:
+            self._current = outer
+
+    @staticmethod
+    def _is_pure(node: Any) -> bool:
+        # Whether an assigned value can be evaluated before the first token without affecting it.
+        if isinstance(node, (ast.Name, ast.Constant)):
+            return True
+        return (
+            isinstance(node, ast.Call) and not node.args and isinstance(node.func, ast.Attribute) and node.func.attr == "current_pos"
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "self")
+
+
+__all__ = ["ParserGenerator"]
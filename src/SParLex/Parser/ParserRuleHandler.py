@@ -1,6 +1,10 @@
 from __future__ import annotations
 from typing import Callable, Final, List, Optional, Tuple, TYPE_CHECKING
 
+from SParLex.Ast.Ast import Ast
+from SParLex.Lexer.Tokens import SpecialToken
+from SParLex.Parser.ParserFailure import FAILURE, ParserFailure
+
 if TYPE_CHECKING:
     from SParLex.Lexer.Tokens import TokenType
     from SParLex.Parser.Parser import Parser
@@ -9,79 +13,107 @@ if TYPE_CHECKING:
 
 
 class ParserRuleHandler[T]:
-    type ParserRule = Callable[[], T]
-    __slots__ = ["_rule", "_parser"]
+    """
+    ParserRuleHandler wraps a rule so it can be parsed once, optionally, or repeatedly. Internally, failures are passed
+    between handlers as the FAILURE sentinel by "try_parse", and only "parse_once" (the call made inside rule bodies)
+    raises, as a ParserFailure, to stop the rule that called it.
+
+    A handler holds the rule and its arguments rather than a closure over them, and keeps no state between parses, so
+    the Parser reuses one handler per rule and arguments (see parser_rule) instead of creating one on every call.
+    """
+
+    __slots__ = ["_parser", "_func", "_args", "_memoize", "_key", "_recover"]
 
-    _rule: Final[ParserRule]
     _parser: Final[Parser]
+    _func: Final[Optional[Callable[..., T]]]
+    _args: Final[Tuple]
+    _memoize: Final[bool]
+    _key: Final[Optional[Tuple[Callable, Tuple]]]
+    _recover: Final[bool]
 
-    def __init__(self, parser: Parser, rule: ParserRule) -> None:
+    def __init__(self, parser: Parser, func: Optional[Callable[..., T]], args: Tuple = (), memoize: bool = False, key: Optional[Tuple[Callable, Tuple]] = None, recover: bool = False) -> None:
         self._parser = parser
-        self._rule = rule
+        self._func = func
+        self._args = args
+        self._memoize = memoize
+        self._key = key
+        self._recover = recover
+
+    def _rule(self) -> T | FAILURE:
+        # Run the rule: through FIRST-set prediction if it has a key, through the packrat memo if it's memoized, or else
+        # directly. Record where an Ast the rule built ends (one it returned from another rule already has its end).
+        if self._key is not None:
+            result = self._parser._parse_predicted(self._func, self._args, self._memoize)
+        elif self._memoize:
+            result = self._parser._parse_memoized(self._func, self._args)
+        else:
+            result = self._func(self._parser, *self._args)
+        if result is not FAILURE and isinstance(result, Ast) and getattr(result, "_end", -1) < 0:
+            result._end = self._parser._index
+        return result
+
+    def predicts_failure(self) -> bool:
+        # Whether FIRST-set prediction rules this rule out at the current position, in which case the index is left where
+        # the failed attempt would have left it. The key (rule and arguments) is only set for rules with prediction enabled.
+        return self._key is not None and self._parser._predicts_failure(self._key)
+
+    def try_parse(self) -> T | FAILURE:
+        # Parse the rule, returning FAILURE rather than raising if it fails.
+        try:
+            return self._rule()
+        except ParserFailure:
+            return FAILURE
 
     def parse_once(self) -> T:
         ast = self._rule()
+        if ast is FAILURE:
+            raise self._parser._failure.with_traceback(None)
         return ast
 
     def parse_optional(self) -> Optional[T]:
-        from SParLex.Parser.ParserError import ParserError
-
         parser_index = self._parser._index
-        try:
-            ast = self._rule()
-            return ast
-        except ParserError:
+        if self.predicts_failure() or (ast := self.try_parse()) is FAILURE:
             self._parser._index = parser_index
             return None
+        return ast
 
     def parse_zero_or_more(self, separator: TokenType, *, propagate_error: bool = False) -> List[T] | Tuple[List[T], ParserError]:
-        from SParLex.Lexer.Tokens import SpecialToken
-        from SParLex.Parser.ParserError import ParserError
-
-        successful_parses, result = 0, []
-        parsed_sep, error = False, None
+        result = []
         while True:
-            try:
-                # If this is the second pass, then require the separator to be parsed.
-                if successful_parses > 0:
-                    self._parser.parse_token(separator).parse_once()
-                    parsed_sep = True
-
-                # Try to parse the AST, and mark the most recent parse as non-separator.
-                ast = self.parse_once()
-                parsed_sep = False
-
-                # Save the AST to the result list and increment the number of ASTs parsed.
-                result.append(ast)
-                successful_parses += 1
-
-            except ParserError as e:
-                # If the most recent parse is a separator, backtrack it because there is no following AST.
-                if parsed_sep:
-                    self._parser._index -= 1 * (separator != SpecialToken.NO_TOK)
-
-                # Save the error and break the loop.
-                error = e
+            # If this is the second pass, then require the separator to be parsed.
+            if result and self._parser.parse_token(separator).try_parse() is FAILURE:
                 break
 
+            # Try to parse the AST (unless it's predicted to fail), recovering from a syntax error in it if it's a recovering
+            # rule and the Parser is recovering (see Parser._parse_recovering). If the most recent parse is a separator,
+            # backtrack it because there is no following AST.
+            if self.predicts_failure() or (ast := self._parser._parse_item_recovering(self) if self._recover and self._parser._recovering else self.try_parse()) is FAILURE:
+                if result:
+                    self._parser._index -= 1 * (separator is not SpecialToken.NO_TOK)
+                break
+
+            # Save the AST to the result list.
+            result.append(ast)
+
         # Return the result, and the with the error if it is to be propagated.
-        return result if not propagate_error else (result, error)
+        return result if not propagate_error else (result, self._parser._error)
 
     def parse_one_or_more(self, separator: TokenType) -> List[T]:
-        result = self.parse_zero_or_more(separator, propagate_error=True)
-        if len(result[0]) < 1:
-            raise result[1]
-        return result[0]
+        result = self.parse_zero_or_more(separator)
+        if len(result) < 1:
+            raise self._parser._failure.with_traceback(None)
+        return result
 
     def parse_two_or_more(self, separator: TokenType) -> List[T]:
-        result = self.parse_zero_or_more(separator, propagate_error=True)
-        if len(result[0]) < 2:
-            raise result[1]
-        return result[0]
+        result = self.parse_zero_or_more(separator)
+        if len(result) < 2:
+            raise self._parser._failure.with_traceback(None)
+        return result
 
     def __or__[U](self, that: ParserRuleHandler[U]) -> ParserAlternateRulesHandler[T | U]:
-        from SParLex.Parser.ParserAlternateRulesHandler import ParserAlternateRulesHandler
-        return ParserAlternateRulesHandler(self._parser).add_parser_rule_handler(self).add_parser_rule_handler(that)
+        # The Parser decides the class of the alternation, which is only a different one when it's being profiled.
+        alternation = self._parser._alternation_class(self._parser)
+        return alternation.add_parser_rule_handler(self).add_parser_rule_handler(that)
 
 
 __all__ = ["ParserRuleHandler"]
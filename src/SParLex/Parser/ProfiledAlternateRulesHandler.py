@@ -0,0 +1,40 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+
+from SParLex.Parser.ParserAlternateRulesHandler import ParserAlternateRulesHandler
+from SParLex.Parser.ParserFailure import FAILURE
+
+
+class ProfiledAlternateRulesHandler[T](ParserAlternateRulesHandler[T]):
+    """
+    ProfiledAlternateRulesHandler is the ParserAlternateRulesHandler a Parser creates when it has a Profiler, which
+    records which alternative matched, against the rule the alternation is parsed in.
+    """
+
+    __slots__ = []
+
+    def _names(self) -> Tuple[str, ...]:
+        return tuple(getattr(handler, "_name", type(handler).__name__) for handler in self._parser_rule_handlers)
+
+    def try_parse(self) -> T | FAILURE:
+        for index, parser_rule_handler in enumerate(self._parser_rule_handlers):
+            parser_index = self._parser._index
+            if not parser_rule_handler.predicts_failure() and (ast := parser_rule_handler.try_parse()) is not FAILURE:
+                self._parser._profiler._alternative_won(self._names(), index)
+                return ast
+            self._parser._index = parser_index
+
+        self._parser.store_error(self._parser._index, "Expected one of the alternatives.")
+        return FAILURE
+
+    def parse_optional(self) -> Optional[T]:
+        for index, parser_rule_handler in enumerate(self._parser_rule_handlers):
+            parser_index = self._parser._index
+            if not parser_rule_handler.predicts_failure() and (ast := parser_rule_handler.parse_optional()) is not None:
+                self._parser._profiler._alternative_won(self._names(), index)
+                return ast
+            self._parser._index = parser_index
+        return None
+
+
+__all__ = ["ProfiledAlternateRulesHandler"]
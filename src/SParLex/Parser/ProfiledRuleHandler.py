@@ -0,0 +1,38 @@
+from __future__ import annotations
+from typing import Callable, Final, Optional, Tuple, TYPE_CHECKING
+
+from SParLex.Parser.ParserFailure import FAILURE
+from SParLex.Parser.ParserRuleHandler import ParserRuleHandler
+
+if TYPE_CHECKING:
+    from SParLex.Parser.Parser import Parser
+    from SParLex.Utils.Profiler import Profiler
+
+
+class ProfiledRuleHandler[T](ParserRuleHandler[T]):
+    """
+    ProfiledRuleHandler is the ParserRuleHandler a Parser creates when it has a Profiler, which records every attempt to
+    parse the rule, and every time prediction rules it out, under the rule's name and arguments.
+    """
+
+    __slots__ = ["_profiler", "_name"]
+
+    _profiler: Final[Profiler]
+    _name: Final[str]
+
+    def __init__(self, parser: Parser, func: Callable[..., T], args: Tuple, memoize: bool, key: Optional[Tuple[Callable, Tuple]], profiler: Profiler, recover: bool = False) -> None:
+        super().__init__(parser, func, args, memoize, key, recover)
+        self._profiler = profiler
+        self._name = func.__name__ + (f"({', '.join(getattr(a, 'name', None) or repr(a) for a in args)})" if args else "")
+
+    def _rule(self) -> T | FAILURE:
+        return self._profiler._call(self._parser, self._name, super()._rule)
+
+    def predicts_failure(self) -> bool:
+        predicted = super().predicts_failure()
+        if predicted:
+            self._profiler._predicted(self._name)
+        return predicted
+
+
+__all__ = ["ProfiledRuleHandler"]
@@ -1,35 +1,55 @@
-from typing import List, Type
-from colorama import Fore, Style
+from typing import List, Optional, Type
 
 from SParLex.Lexer.Tokens import Token, TokenType
+from SParLex.Lexer.TokenStream import TokenStream
+from SParLex.Utils.LineIndex import LineIndex
 
 
 class ErrorFormatter:
     _token_set: Type[TokenType]
-    _tokens: List[Token]
+    _tokens: List[Token] | TokenStream
     _file_path: str
+    _line_index: Optional[LineIndex]
 
-    def __init__(self, token_set: Type[TokenType], tokens: List[Token], file_path: str) -> None:
+    def __init__(self, token_set: Type[TokenType], tokens: List[Token] | TokenStream, file_path: str) -> None:
         self._token_set = token_set
         self._tokens = tokens
         self._file_path = file_path[file_path.rfind("src\\") + 4:]
+        self._line_index = None
+
+    @property
+    def line_index(self) -> LineIndex:
+        # Built on first use, and reused for every error formatted against these tokens.
+        if self._line_index is None:
+            self._line_index = LineIndex(self._tokens, self._token_set.newline_token())
+        return self._line_index
+
+    def error(self, start_pos: int, message: str = "", tag_message: str = "", minimal: bool = False, end_pos: Optional[int] = None) -> str:
+        # The "end_pos" is the position after the last token to underline, ie the end of an AST node's tokens. By default,
+        # only the token at "start_pos" is underlined. Colorama is imported here, so it's only loaded once there's an error.
+        from colorama import Fore, Style
 
-    def error(self, start_pos: int, message: str = "", tag_message: str = "", minimal: bool = False) -> str:
         while self._tokens[start_pos].token_type in [self._token_set.newline_token(), self._token_set.whitespace_token()]:
             start_pos += 1
 
         # Get the tokens at the start and end of the line containing the error. Skip the leading newline.
-        error_line_start_pos = [i for i, x in enumerate(self._tokens[:start_pos]) if x.token_type == self._token_set.newline_token()][-1] + 1
-        error_line_end_pos = ([i for i, x in enumerate(self._tokens[start_pos:]) if x.token_type == self._token_set.newline_token()] or [len(self._tokens) - 1])[0] + start_pos
+        line_index = self.line_index
+        error_line_start_pos, error_line_end_pos = line_index.line_span(start_pos)
         error_line_tokens = self._tokens[error_line_start_pos:error_line_end_pos]
         error_line_as_string = "".join([str(token) for token in error_line_tokens])
 
         # Get the line number of the error
-        error_line_number = len([x for x in self._tokens[:start_pos] if x.token_type == self._token_set.newline_token()])
+        error_line_number = line_index.line(start_pos)
 
-        # The number of "^" is the length of the token data where the error is. Todo: Should span entire AST node.
-        carets = "^" * len(self._tokens[start_pos].token_metadata)
-        carets = " " * sum([len(str(token)) for token in self._tokens[error_line_start_pos : start_pos]]) + carets
+        # The number of "^" is the length of the tokens being underlined, up to the end of the line. The column and the
+        # width are measured in the displayed tokens' text, which (unlike source offsets) leaves out discarded comments.
+        token_lengths = [len(str(token)) for token in error_line_tokens]
+        column = sum(token_lengths[:start_pos - error_line_start_pos])
+        if end_pos is None or end_pos <= start_pos + 1:
+            carets = "^" * len(self._tokens[start_pos].token_metadata)
+        else:
+            carets = "^" * sum(token_lengths[start_pos - error_line_start_pos:min(end_pos, error_line_end_pos) - error_line_start_pos])
+        carets = " " * column + carets
 
         # Print the preceding spaces before the error line
         l1 = len(error_line_as_string)
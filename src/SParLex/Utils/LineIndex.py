@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+from SParLex.Lexer.Tokens import SpecialToken, Token, TokenType
+from SParLex.Lexer.TokenStream import TokenStream
+
+
+class LineIndex:
+    """
+    LineIndex maps token positions to lines and columns. It stores the positions of the newline tokens, and the offset
+    of each token into the source, so the line containing a position is found with a binary search, and its column by
+    subtracting offsets, without scanning the tokens.
+
+    A TokenStream's start offsets are used as they are. For a list of tokens, the offsets are the running total of the
+    tokens' lengths, computed once when the index is built.
+
+    Examples:
+        - line_index.line(pos) -> the line number of the token at "pos" (the leading newline is line 0)
+        - line_index.line_span(pos) -> the positions of the first token on the line, and of the newline ending it (or
+          the number of tokens, on the last line)
+        - line_index.column(pos) -> the number of characters before the token at "pos" on its line
+    """
+
+    __slots__ = ["newlines", "offsets", "token_count"]
+
+    newlines: Sequence[int]
+    offsets: Sequence[int]
+    token_count: int
+
+    def __init__(self, tokens: List[Token] | TokenStream, newline_token: TokenType | SpecialToken) -> None:
+        self.token_count = len(tokens)
+        if isinstance(tokens, TokenStream):
+            newline_kind = tokens.table.ordinals[newline_token]
+            self.newlines = array(tokens.starts.typecode, [i for i, kind in enumerate(tokens.kinds) if kind == newline_kind])
+            self.offsets = tokens.starts
+        else:
+            self.newlines = array("Q", [i for i, token in enumerate(tokens) if token.token_type == newline_token])
+            self.offsets = array("Q", accumulate((len(str(token)) for token in tokens), initial=0))
+
+    def line(self, pos: int) -> int:
+        # The number of newlines before the position.
+        return bisect_left(self.newlines, pos)
+
+    def line_span(self, pos: int) -> Tuple[int, int]:
+        # The first token of the line is the one after the preceding newline, and the line ends at the next newline (or
+        # after the last token, if there is no newline after the position).
+        line = self.line(pos)
+        start = self.newlines[line - 1] + 1 if line else 0
+        end = self.newlines[line] if line < len(self.newlines) else self.token_count
+        return start, end
+
+    def column(self, pos: int) -> int:
+        return self.offset(pos) - self.offset(self.line_span(pos)[0])
+
+    def offset(self, pos: int) -> int:
+        # The offset of the token at the position, into the source. Past the last token, this is the end of the source.
+        return self.offsets[pos] if pos < len(self.offsets) else self.offsets[-1]
+
+
+__all__ = ["LineIndex"]
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from array import array
+from functools import cache
+from typing import Any, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+
+from SParLex.Ast import AstWalker, RootAst, TokAst
+from SParLex.Lexer.Lexer import Lexer
+from SParLex.Lexer.LexerTable import LexerTable
+from SParLex.Lexer.Tokens import SpecialToken, TokenType
+from SParLex.Lexer.TokenStream import TokenStream
+from SParLex.Parser.ParserError import ParserError
+
+if TYPE_CHECKING:
+    from SParLex.Parser.Parser import Parser
+
+
+# Bumped whenever the layout of an entry changes, so entries written by another version are never read. The header is
+# the magic, the version, the typecode of the offset arrays, the number of tokens and the length of the pickled AST.
+_VERSION = 1
+_MAGIC = b"SPLX"
+_HEADER = struct.Struct("<4sHcQQ")
+
+# Parser options that don't change the AST or the errors, so aren't part of an entry's key.
+_UNKEYED_OPTIONS = frozenset({"packrat", "packrat_size", "predict"})
+
+
+@cache
+def _fingerprint(token_set: Type[TokenType], parser_class: Optional[type]) -> bytes:
+    # Everything, other than the source, that the tokens and AST depend on: the token set's members (their order gives
+    # the token ordinals) and the code of every method of the parser class and its bases, including the rules wrapped by
+    # parser_rule. Line numbers are part of the code, so editing the parser's module invalidates its entries.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{_VERSION}:{sys.byteorder}:{sys.version_info[:2]}".encode())
+    digest.update(f"{token_set.__module__}.{token_set.__qualname__}".encode())
+    for name, member in token_set._member_map_.items():
+        digest.update(f"{name}={member.value!r};".encode())
+    for special in ("single_line_comment_token", "multi_line_comment_token", "newline_token", "whitespace_token"):
+        digest.update(repr(getattr(token_set, special)()).encode())
+
+    for cls in parser_class.__mro__[:-1] if parser_class else ():
+        digest.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+        for name, attribute in sorted(vars(cls).items()):
+            digest.update(name.encode())
+            _digest_code(digest, getattr(attribute, "__func__", attribute))
+    return digest.digest()
+
+
+def _options_key(options: Dict[str, Any]) -> str:
+    # The parser options that can change the AST or the errors, as text. Only plain values (None, bools, numbers,
+    # strings and token types, and lists and tuples of them) have the same text in every process.
+    def keyable(value: Any) -> bool:
+        if isinstance(value, (list, tuple)):
+            return all(keyable(item) for item in value)
+        return value is None or isinstance(value, (bool, int, float, str, TokenType, SpecialToken))
+
+    items = []
+    for name, value in sorted(options.items()):
+        if name in _UNKEYED_OPTIONS:
+            continue
+        if not keyable(value):
+            raise ValueError(f"The parser option '{name}' can't be part of a cache key, so can't be used with a ParseCache.")
+        items.append(f"{name}={value!r};")
+    return "".join(items)
+
+
+def _rebind_tokens(ast: RootAst, tokens: TokenStream) -> None:
+    # Pickled tokens lose their spans (see Token.__reduce__), so each TokAst's token is replaced by the token at its
+    # position in the tokens the AST was parsed from. A TokAst of another type there (ie "no token") isn't one of them.
+    kinds, ordinals = tokens.kinds, tokens.table.ordinals
+    for node in AstWalker.pre_order(ast):
+        if isinstance(node, TokAst) and 0 <= node.pos < len(kinds) and kinds[node.pos] == ordinals.get(node.token.token_type):
+            node.token = tokens[node.pos]
+
+
+def _digest_code(digest: Any, function: Any) -> None:
+    # Hash a function's code, and the functions (and simple values) it closes over, ie the rule inside a parser_rule.
+    if not hasattr(function, "__code__"):
+        return
+    digest.update(marshal.dumps(function.__code__))
+    for cell in function.__closure__ or ():
+        contents = cell.cell_contents
+        if hasattr(contents, "__code__"):
+            _digest_code(digest, contents)
+        elif contents is None or isinstance(contents, (bool, int, str)):
+            digest.update(repr(contents).encode())
+
+
+class ParseCache:
+    """
+    ParseCache is an opt-in, on-disk cache of TokenStreams and ASTs, so unchanged sources aren't lexed and parsed again.
+    Entries are keyed by a hash of the source, and a fingerprint of the token set (and of the parser class and the
+    options it's given, for ASTs), so a change to the grammar misses the cache rather than returning stale results.
+    Changes the fingerprint can't see, such as to AST classes defined in another module, need the cache to be cleared.
+    Options that don't change the AST (packrat parsing and prediction) share entries, and options that can't be keyed,
+    such as a Profiler, raise a ValueError.
+
+    Each entry is a file: a header, then the token kinds, starts and ends as raw arrays (loaded with a single copy each),
+    or the AST, pickled, with its tokens read from the cached tokens again when it's loaded. Entries are written to a temporary file and renamed into place, so any number of processes
+    (ie the workers of parse_files) can share a cache directory, and a reader never sees a partial entry. Reading an
+    entry marks it as recently used, and once the cache grows past "max_size" bytes, the least recently used entries
+    are removed. Only failed parses aren't cached, so they raise their ParserError as normal, and so do the parses a
+    recovering Parser recovered from errors in, unless "parse_with_errors" is used to get the partial AST too.
+
+    The cache directory must be trusted, as ASTs are loaded with pickle.
+
+    Example:
+        - cache = ParseCache(".sparlex_cache", max_size=1 << 30)
+        - ast = cache.parse(code, MyTokenType, MyParser, file_name="main.spp")
+        - ast, errors = cache.parse_with_errors(code, MyTokenType, MyParser, file_name="main.spp", recover=True)
+    """
+
+    _directory: str
+    _max_size: int
+    _size: Optional[int]
+
+    def __init__(self, directory: str | os.PathLike, max_size: int = 1 << 30) -> None:
+        self._directory = os.fspath(directory)
+        self._max_size = max_size
+        self._size = None
+        os.makedirs(self._directory, exist_ok=True)
+
+    def lex(self, code: str, token_set: Type[TokenType]) -> TokenStream:
+        lexer = Lexer(code, token_set)
+        source = lexer.text()
+        key = self._key(source, token_set, None)
+
+        # Rebuild the TokenStream around the source, from the stored arrays.
+        if (entry := self._load(key)) is not None:
+            offset_code, count, data, _ = entry
+            tokens = TokenStream(source, LexerTable.of(token_set))
+            tokens.starts, tokens.ends = array(offset_code), array(offset_code)
+            kinds_length, offsets_length = count * tokens.kinds.itemsize, count * tokens.starts.itemsize
+            tokens.kinds.frombytes(data[:kinds_length])
+            tokens.starts.frombytes(data[kinds_length:kinds_length + offsets_length])
+            tokens.ends.frombytes(data[kinds_length + offsets_length:])
+            return tokens
+
+        tokens = Lexer(source, token_set).lex()
+        self._store(key, tokens.starts.typecode, len(tokens), [tokens.kinds, tokens.starts, tokens.ends], b"")
+        return tokens
+
+    def parse(self, code: str, token_set: Type[TokenType], parser_class: Type[Parser], file_name: str = "", **parser_kwargs: Any) -> RootAst:
+        # A recovering Parser's partial AST isn't returned as if the parse succeeded: the errors it recovered from are
+        # raised, as one ParserError (see "parse_with_errors" for the partial AST along with them).
+        ast, errors = self.parse_with_errors(code, token_set, parser_class, file_name, **parser_kwargs)
+        if errors:
+            raise ParserError("\n".join(str(error) for error in errors))
+        return ast
+
+    def parse_with_errors(
+            self, code: str, token_set: Type[TokenType], parser_class: Type[Parser], file_name: str = "",
+            **parser_kwargs: Any) -> Tuple[RootAst, List[ParserError]]:
+        # The AST, and the formatted errors a recovering Parser recovered from (empty for an AST from the cache).
+        source = Lexer(code, token_set).text()
+        key = self._key(source, token_set, parser_class, _options_key(parser_kwargs))
+        if (entry := self._load(key)) is not None:
+            ast = pickle.loads(entry[3])
+            _rebind_tokens(ast, self.lex(source, token_set))
+            return ast, []
+
+        # Parse the (possibly cached) tokens. A ParserError propagates without an entry being stored, as does the partial
+        # AST of a recovering Parser that recovered from errors.
+        parser = parser_class(token_set, self.lex(source, token_set), file_name, **parser_kwargs)
+        ast = parser.parse()
+        if not parser.errors():
+            self._store(key, b"I", 0, [], pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL))
+        return ast, parser.format_errors()
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            self._remove(path)
+        self._size = 0
+
+    def _key(self, source: str, token_set: Type[TokenType], parser_class: Optional[type], options: str = "") -> str:
+        digest = hashlib.blake2b(_fingerprint(token_set, parser_class), digest_size=20)
+        digest.update(options.encode())
+        digest.update(source.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key[:2], key)
+
+    def _load(self, key: str) -> Optional[Tuple[str, int, memoryview, memoryview]]:
+        # Read and validate an entry, returning its offset typecode, token count, token arrays and pickled AST. Missing,
+        # truncated or foreign entries are treated as misses.
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                data = memoryview(file.read())
+            os.utime(path)
+        except OSError:
+            return None
+
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, offset_code, count, ast_length = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION or offset_code not in (b"I", b"Q"):
+            return None
+        offset_code = offset_code.decode()
+        arrays_length = count * (array("H").itemsize + 2 * array(offset_code).itemsize)
+        if len(data) != _HEADER.size + arrays_length + ast_length:
+            return None
+        body = data[_HEADER.size:]
+        return offset_code, count, body[:arrays_length], body[arrays_length:]
+
+    def _store(self, key: str, offset_code: str | bytes, count: int, arrays: List[array], ast: bytes) -> None:
+        # Write the entry to a temporary file and rename it into place. Failing to write is not an error, as the cache is
+        # only an optimisation.
+        offset_code = offset_code.encode() if isinstance(offset_code, str) else offset_code
+        directory = os.path.dirname(self._path(key))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(_HEADER.pack(_MAGIC, _VERSION, offset_code, count, len(ast)))
+                for values in arrays:
+                    values.tofile(file)
+                file.write(ast)
+                size = file.tell()
+            os.replace(temporary_path, self._path(key))
+        except OSError:
+            self._remove(temporary_path)
+            return
+
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        else:
+            self._size += size
+        if self._size > self._max_size:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Remove the least recently used entries, down to three quarters of the maximum size, so the directory isn't
+        # rescanned on every write. Other processes may remove the same entries at the same time, which is harmless.
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self._max_size * 3 // 4:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        # Every file in the cache, with the time it was last used and its size.
+        entries = []
+        with os.scandir(self._directory) as directories:
+            for directory in directories:
+                if not directory.is_dir():
+                    continue
+                with os.scandir(directory.path) as files:
+                    for file in files:
+                        try:
+                            stat = file.stat()
+                        except OSError:
+                            continue
+                        entries.append((file.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+__all__ = ["ParseCache"]
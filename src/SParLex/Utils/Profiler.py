@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from SParLex.Parser.ParserFailure import FAILURE
+from SParLex.Utils.RuleStats import RuleStats
+from SParLex.Utils.TokenStats import TokenStats
+
+if TYPE_CHECKING:
+    from SParLex.Lexer.LexerTable import LexerTable, Segment
+    from SParLex.Parser.Parser import Parser
+
+
+class _CountingPattern:
+    # Stands in for a segment's pattern in a profiled Lexer, counting the attempts and matches of its alternatives.
+    __slots__ = ["_pattern", "_stats", "_positions"]
+
+    def __init__(self, pattern: Any, names: List[str], tokens: Dict[str, TokenStats]) -> None:
+        self._pattern = pattern
+        self._stats = [tokens.get(name) or tokens.setdefault(name, TokenStats(name)) for name in names]
+        self._positions = {name: i for i, name in enumerate(names)}
+
+    def match(self, *args) -> Any:
+        # The alternatives are tried in order, so the ones up to the one that matched were all attempted.
+        matched = self._pattern.match(*args)
+        tried = len(self._stats) if matched is None else self._positions.get(matched.lastgroup, 0) + 1
+        for stats in self._stats[:tried]:
+            stats.attempts += 1
+        if matched is not None:
+            self._stats[tried - 1].matches += 1
+        return matched
+
+
+class Profiler:
+    """
+    Profiler records where a Parser (and a Lexer) spends its time, for finding the rules of a grammar to reorder or
+    memoize. It's enabled by passing it to a Parser or Lexer constructor: a profiled Parser creates instrumented
+    ParserRuleHandlers instead of the plain ones, and a profiled Lexer matches with counting patterns, so a Parser or
+    Lexer without one runs exactly the same code as before. Profiling itself is slow, so timings are best compared
+    between rules rather than with an unprofiled parse.
+
+    Per rule, "rules" holds a RuleStats (see there), and per token type, "tokens" holds a TokenStats. The "report"
+    method formats the rules as a table, sorted by any RuleStats field, and "flame_graph" returns the exclusive time of
+    every stack of rules in the collapsed format that flamegraph.pl and speedscope read. One Profiler can be shared by
+    several parses, which accumulate, but not by parses running at the same time.
+
+    Example:
+        - profiler = Profiler()
+        - MyParser(MyTokenType, Lexer(code, MyTokenType, profiler=profiler).lex(), profiler=profiler).parse()
+        - print(profiler.report(sort_by="inclusive_ns", limit=20))
+    """
+
+    rules: Dict[str, RuleStats]
+    tokens: Dict[str, TokenStats]
+    stacks: Dict[Tuple[str, ...], int]
+    _stack: List[str]
+    _child_ns: List[int]
+    _active: Dict[str, int]
+    _segments: Dict[int, Tuple[LexerTable, Dict[str, Tuple[Segment, ...]], Tuple[Segment, ...]]]
+
+    def __init__(self) -> None:
+        self.rules = {}
+        self.tokens = {}
+        self.stacks = {}
+        self._stack = []
+        self._child_ns = []
+        self._active = {}
+        self._segments = {}
+
+    def reset(self) -> None:
+        self.rules.clear()
+        self.tokens.clear()
+        self.stacks.clear()
+        self._segments.clear()
+
+    # ===== PARSER =====
+
+    def _call(self, parser: Parser, name: str, rule: Callable[[], Any]) -> Any:
+        # Run a rule, timing it, and counting how far past its start it examined (see Parser._examined) if it fails.
+        stats = self.rules.get(name) or self.rules.setdefault(name, RuleStats(name))
+        self._stack.append(name)
+        self._child_ns.append(0)
+        self._active[name] = self._active.get(name, 0) + 1
+        start, outer_examined, parser._examined = parser._index, parser._examined, -1
+        result = FAILURE
+        begin = perf_counter_ns()
+        try:
+            result = rule()
+            return result
+
+        finally:
+            elapsed = perf_counter_ns() - begin
+            examined, parser._examined = parser._examined, max(outer_examined, parser._examined)
+            exclusive = elapsed - self._child_ns.pop()
+            stack = tuple(self._stack)
+            self._stack.pop()
+            if self._child_ns:
+                self._child_ns[-1] += elapsed
+
+            stats.calls += 1
+            if result is FAILURE:
+                stats.failures += 1
+                stats.backtracked += max(0, examined - start)
+            else:
+                stats.successes += 1
+            stats.exclusive_ns += exclusive
+            self.stacks[stack] = self.stacks.get(stack, 0) + exclusive
+            self._active[name] -= 1
+            if not self._active[name]:
+                stats.inclusive_ns += elapsed
+
+    def _predicted(self, name: str) -> None:
+        stats = self.rules.get(name) or self.rules.setdefault(name, RuleStats(name))
+        stats.predicted += 1
+
+    def _alternative_won(self, names: Tuple[str, ...], index: int) -> None:
+        # Credit the alternative to the alternation's position in the rule currently being parsed.
+        rule = self._stack[-1] if self._stack else "<root>"
+        stats = self.rules.get(rule) or self.rules.setdefault(rule, RuleStats(rule))
+        wins = stats.alternatives.get(names) or stats.alternatives.setdefault(names, [0] * len(names))
+        wins[index] += 1
+
+    def report(self, sort_by: str = "exclusive_ns", limit: Optional[int] = None) -> str:
+        # A table of the rules, sorted by a RuleStats field (descending), followed by the token types' lexer counters.
+        rows = sorted(self.rules.values(), key=lambda stats: getattr(stats, sort_by), reverse=True)[:limit]
+        lines = [f"{'rule':<40} {'calls':>9} {'ok':>9} {'fail':>9} {'predicted':>9} {'backtrack':>9} {'incl ms':>9} {'excl ms':>9}"]
+        for stats in rows:
+            lines.append(
+                f"{stats.name[:40]:<40} {stats.calls:>9} {stats.successes:>9} {stats.failures:>9} {stats.predicted:>9} "
+                f"{stats.backtracked:>9} {stats.inclusive_ns / 1e6:>9.2f} {stats.exclusive_ns / 1e6:>9.2f}")
+            for names, wins in stats.alternatives.items():
+                lines.append(f"    {' | '.join(f'{name} ({count})' for name, count in zip(names, wins))}")
+
+        if self.tokens:
+            lines.append("")
+            lines.append(f"{'token':<40} {'attempts':>9} {'matches':>9}")
+            for stats in sorted(self.tokens.values(), key=lambda stats: stats.attempts, reverse=True)[:limit]:
+                lines.append(f"{stats.name[:40]:<40} {stats.attempts:>9} {stats.matches:>9}")
+        return "\n".join(lines)
+
+    def flame_graph(self) -> str:
+        # One "rule;rule;rule nanoseconds" line per stack of rules, with the time spent in the innermost rule itself.
+        return "\n".join(f"{';'.join(stack)} {ns}" for stack, ns in self.stacks.items()) + "\n"
+
+    # ===== LEXER =====
+
+    def _instrument(self, table: LexerTable) -> Tuple[Dict[str, Tuple[Segment, ...]], Tuple[Segment, ...]]:
+        # The table's dispatch and default segments, with every pattern replaced by a counting one. Segments shared by
+        # several characters stay shared, so each is counted once per attempt.
+        if (entry := self._segments.get(id(table))) is not None and entry[0] is table:
+            return entry[1], entry[2]
+
+        replaced: Dict[int, Tuple[Segment, ...]] = {}
+        def instrument(segments: Tuple[Segment, ...]) -> Tuple[Segment, ...]:
+            if id(segments) not in replaced:
+                replaced[id(segments)] = tuple(
+                    (_CountingPattern(pattern, [token_type.name] if token_type else sorted(pattern.groupindex, key=pattern.groupindex.get), self.tokens), token_type, sliced)
+                    for pattern, token_type, sliced in segments)
+            return replaced[id(segments)]
+
+        dispatch = {char: instrument(segments) for char, segments in table.dispatch.items()}
+        default = instrument(table.default)
+        self._segments[id(table)] = (table, dispatch, default)
+        return dispatch, default
+
+
+__all__ = ["Profiler"]
@@ -0,0 +1,29 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+
+@dataclass(slots=True)
+class RuleStats:
+    """
+    RuleStats is what a Profiler recorded about one parser rule (with its arguments, ie "parse_token(TkSemicolon)"):
+    how often it was attempted, succeeded, failed, or was skipped because FIRST-set prediction ruled it out, how many
+    tokens past its start its failed attempts examined before being backtracked, and the time spent in it, including
+    and excluding the rules it called. Recursive calls only count towards the inclusive time once.
+
+    For each alternation ("a | b | c") parsed inside the rule, keyed by the names of its alternatives, it counts how
+    often each alternative was the one that matched.
+    """
+
+    name: str
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    predicted: int = 0
+    backtracked: int = 0
+    inclusive_ns: int = 0
+    exclusive_ns: int = 0
+    alternatives: Dict[Tuple[str, ...], List[int]] = field(default_factory=dict)
+
+
+__all__ = ["RuleStats"]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class TokenStats:
+    """
+    TokenStats is what a Profiler recorded about one token type while lexing: how many times the Lexer tried to match
+    it, and how many of those attempts matched. An alternative in a shared alternation counts as attempted when the
+    alternation is tried and no earlier alternative in it matched.
+    """
+
+    name: str
+    attempts: int = 0
+    matches: int = 0
+
+
+__all__ = ["TokenStats"]